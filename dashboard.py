@@ -4,10 +4,28 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
+import bisect
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import warnings
 warnings.filterwarnings('ignore')
 
+from data_quality_analysis import (
+    CREDIT_NOTES_FILE,
+    CREDIT_NOTES_PARTITION_DIR,
+    INVOICES_FILE,
+    INVOICES_PARTITION_DIR,
+    LOAD_WORKERS,
+    column_memory_report,
+    file_signature,
+    list_partitions,
+    reconcile_credit_notes,
+)
+
 # Page configuration
 st.set_page_config(
     page_title="Financial Dashboard",
@@ -160,77 +178,269 @@ def format_currency_compact(value: float) -> str:
     except Exception:
         return str(value)
 
-@st.cache_data
-def load_data():
-    """Load and preprocess the CSV data"""
+# How often open sessions check the source files for replacement
+SOURCE_REFRESH_INTERVAL = "30s"
+
+# Parsed source files kept in cache (one entry per file or monthly partition)
+MAX_CACHED_FILES = 256
+
+# Concatenated multi-partition frames kept in memory (recent date windows)
+MAX_CACHED_CONCATS = 4
+
+# Students offered in the drill-down lookup for one search
+DRILLDOWN_MATCHES = 50
+
+# Rows serialized per chunk when exporting the filtered view
+EXPORT_CHUNK_ROWS = 50_000
+
+# Money columns are held as exact integer cents (nullable Int64)
+MONEY_COLUMNS_INVOICES = ['total', 'amount_paid', 'due_amount', 'gst', 'sub_total']
+MONEY_COLUMNS_CREDIT = ['Total', 'credit_amount', 'AppliedAmount', 'unapplied_amount']
+
+# Wide free-text columns the dashboard never shows are not loaded
+UNUSED_COLUMNS = ['notes', 'status_notes', 'credit_file_name', 'bc_item_master_numbers']
+
+# Text columns with at most this share of distinct values are stored as categoricals
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# Trend chart granularities: resample rule, adjective for titles, hover date format.
+# Buckets are labelled by their first day, so weeks run Monday to Sunday
+TREND_GRANULARITIES = {
+    'Day': ('D', 'Daily', '%Y-%m-%d'),
+    'Week': ('W-MON', 'Weekly', 'Week of %Y-%m-%d'),
+    'Month': ('MS', 'Monthly', '%b %Y'),
+    'Quarter': ('QS', 'Quarterly', '%Y Q%q'),
+    'Year': ('YS', 'Yearly', '%Y'),
+}
+
+# Trend charts send at most this many points (about one per pixel of a half-width
+# chart) and switch to WebGL rendering above WEBGL_MIN_POINTS
+TREND_MAX_POINTS = 800
+WEBGL_MIN_POINTS = 500
+
+# Daily series kept per dataset version and filter combination
+MAX_CACHED_DAILY_SERIES = 16
+
+
+def to_cents(series):
+    """Parse a money column into exact integer cents"""
+    return (pd.to_numeric(series, errors='coerce') * 100).round().astype('Int64')
+
+
+def to_dollars(cents):
+    """Convert integer cents (a scalar or Series) back to float dollars for display"""
+    if isinstance(cents, pd.Series):
+        return cents.astype('float64') / 100
+    return np.nan if pd.isna(cents) else cents / 100
+
+
+def compact_text_columns(df):
+    """Store repetitive text columns (names, statuses) as categoricals"""
+    for col in df.select_dtypes(include=['object']).columns:
+        if df[col].nunique() <= len(df) * CATEGORY_MAX_UNIQUE_RATIO:
+            df[col] = df[col].astype('category')
+    return df
+
+def dataset_signature(file_path, partition_dir):
+    """(month, path, signature) for each file of a dataset.
+
+    A partition directory gives one entry per monthly file; otherwise the
+    single CSV is one entry with no month, so it is never pruned.
+    """
+    if os.path.isdir(partition_dir):
+        return tuple(
+            (month, path, file_signature(path))
+            for month, path in list_partitions(partition_dir)
+        )
+    return ((None, file_path, file_signature(file_path)),)
+
+
+def source_signatures():
+    """Current signature of each source dataset"""
+    return {
+        'invoices': dataset_signature(INVOICES_FILE, INVOICES_PARTITION_DIR),
+        'credit_notes': dataset_signature(CREDIT_NOTES_FILE, CREDIT_NOTES_PARTITION_DIR),
+    }
+
+
+def partition_date_bounds(partitions):
+    """First and last day covered by monthly partitions, or None for a single file"""
+    if not partitions or any(month is None for month, _, _ in partitions):
+        return None
+    return partitions[0][0].start_time.date(), partitions[-1][0].end_time.date()
+
+
+def partition_overlaps(month, date_range):
+    """Whether a partition month can hold rows inside the (start, end) date range"""
+    if month is None or date_range is None:
+        return True
+    start_date, end_date = date_range
+    return month.start_time.date() <= end_date and month.end_time.date() >= start_date
+
+
+@st.cache_data(max_entries=MAX_CACHED_FILES, show_spinner=False)
+def load_invoices(path, signature):
+    """Load and preprocess an invoices CSV (cached until its signature changes)"""
+    invoices_df = pd.read_csv(path, usecols=lambda col: col not in UNUSED_COLUMNS)
+    
+    # Convert date columns
+    date_columns_invoices = ['invoice_date', 'due_date', 'created', 'modified']
+    for col in date_columns_invoices:
+        if col in invoices_df.columns:
+            invoices_df[col] = pd.to_datetime(invoices_df[col], errors='coerce')
+    
+    # Convert numeric columns
+    numeric_columns_invoices = ['total_hours', 'total_course_units']
+    for col in numeric_columns_invoices:
+        if col in invoices_df.columns:
+            invoices_df[col] = pd.to_numeric(invoices_df[col], errors='coerce')
+    for col in MONEY_COLUMNS_INVOICES:
+        if col in invoices_df.columns:
+            invoices_df[col] = to_cents(invoices_df[col])
+
+    # Normalize/rename payment status values
+    if 'payment_status' in invoices_df.columns:
+        def normalize_payment_status(value: object) -> object:
+            if pd.isna(value):
+                return value
+            text = str(value).strip()
+            key = text.upper()
+            mapping = {
+                'P': 'Paid',
+                'PAID': 'Paid',
+                'U': 'Unpaid',
+                'UNPAID': 'Unpaid',
+                'PP': 'Partially Paid',
+                'PARTIALLY PAID': 'Partially Paid',
+                'CD': 'Closed',
+                'CLOSED': 'Closed',
+                
+            }
+            return mapping.get(key, text)
+
+        invoices_df['payment_status'] = invoices_df['payment_status'].apply(normalize_payment_status)
+    
+    return compact_text_columns(invoices_df)
+
+@st.cache_data(max_entries=MAX_CACHED_FILES, show_spinner=False)
+def load_credit_notes(path, signature):
+    """Load and preprocess a credit notes CSV (cached until its signature changes)"""
+    credit_notes_df = pd.read_csv(path, usecols=lambda col: col not in UNUSED_COLUMNS)
+    
+    # Convert date columns
+    date_columns_credit = ['Date', 'created', 'modified']
+    for col in date_columns_credit:
+        if col in credit_notes_df.columns:
+            credit_notes_df[col] = pd.to_datetime(credit_notes_df[col], errors='coerce')
+    
+    # Convert numeric columns
+    for col in MONEY_COLUMNS_CREDIT:
+        if col in credit_notes_df.columns:
+            credit_notes_df[col] = to_cents(credit_notes_df[col])
+    
+    # Normalize/rename credit status values
+    if 'credit_status' in credit_notes_df.columns:
+        def normalize_credit_status(value: object) -> object:
+            if pd.isna(value):
+                return value
+            text = str(value).strip()
+            key = text.upper() 
+            mapping = {
+                'CR': 'Credit',
+                'CREDIT': 'Credit',
+                'CD': 'Closed',
+                'CLOSED': 'Closed',
+            }
+            return mapping.get(key, text)
+
+        credit_notes_df['credit_status'] = credit_notes_df['credit_status'].apply(normalize_credit_status)
+    
+    return compact_text_columns(credit_notes_df)
+
+@st.cache_resource
+def loaded_file_signatures():
+    """Signature each source path was last loaded with, shared by every session"""
+    return {}
+
+def load_file(loader, path, signature):
+    """Load one source file, evicting its cached copy for the previous signature.
+
+    A replaced file would otherwise leave its stale parsed copy resident
+    until max_entries newer entries pushed it out.
+    """
+    loaded = loaded_file_signatures()
+    previous = loaded.get(path)
+    if previous is not None and previous != signature:
+        loader.clear(path, previous)
+    loaded[path] = signature
+    return loader(path, signature)
+
+def select_partitions(partitions, date_range=None):
+    """Partitions that can hold rows inside date_range"""
+    selected = [p for p in partitions if partition_overlaps(p[0], date_range)]
+    if not selected:
+        # Still load one partition so an empty selection keeps its columns
+        selected = partitions[:1]
+    return selected
+
+def load_partitions(partitions, loader, date_range=None):
+    """Load a dataset's files in parallel, skipping partitions outside date_range"""
+    selected = select_partitions(partitions, date_range)
+    if len(selected) == 1:
+        _, path, signature = selected[0]
+        return load_file(loader, path, signature)
+    return concat_partitions(tuple(selected), loader)
+
+@st.cache_resource(max_entries=MAX_CACHED_CONCATS, show_spinner=False)
+def concat_partitions(selected, _loader):
+    """Load and concatenate the selected partitions, once per set of partition signatures.
+
+    Partition paths differ between datasets, so the selection alone identifies
+    the loader. Cached as a shared resource (no per-session copy), so treat it
+    as read-only.
+    """
+    return read_partitions(selected, _loader)
+
+def read_partitions(selected, loader):
+    """Load partitions in parallel and concatenate them"""
+    # Workers share this session's context so the cached loaders work from threads
+    ctx = get_script_run_ctx()
+    
+    def load_partition(partition):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        _, path, signature = partition
+        return load_file(loader, path, signature)
+    
+    with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as executor:
+        frames = list(executor.map(load_partition, selected))
+    
+    # Categories differ between partitions, so recompact after concatenating
+    return compact_text_columns(pd.concat(frames, ignore_index=True))
+
+def load_full_history(partitions, loader, loaded=None):
+    """Every partition of a dataset, without keeping the concatenated frame cached.
+
+    loaded is returned as is when the caller already holds every partition.
+    """
+    if loaded is not None:
+        return loaded
+    if len(partitions) == 1:
+        _, path, signature = partitions[0]
+        return load_file(loader, path, signature)
+    return read_partitions(partitions, loader)
+
+def load_data(signatures=None, invoice_date_range=None):
+    """Load and preprocess the CSV data.
+
+    Each file (or monthly partition) is cached under its own signature, so
+    replacing one export only reloads that file. Invoice partitions outside
+    invoice_date_range are not read at all.
+    """
+    if signatures is None:
+        signatures = source_signatures()
     try:
-        # Load funding invoices
-        invoices_df = pd.read_csv('funding_invoices.csv')
-        
-        # Load credit notes
-        credit_notes_df = pd.read_csv('funding_invoice_credit_notes.csv')
-        
-        # Convert date columns
-        date_columns_invoices = ['invoice_date', 'due_date', 'created', 'modified']
-        for col in date_columns_invoices:
-            if col in invoices_df.columns:
-                invoices_df[col] = pd.to_datetime(invoices_df[col], errors='coerce')
-        
-        date_columns_credit = ['Date', 'created', 'modified']
-        for col in date_columns_credit:
-            if col in credit_notes_df.columns:
-                credit_notes_df[col] = pd.to_datetime(credit_notes_df[col], errors='coerce')
-        
-        # Convert numeric columns
-        numeric_columns_invoices = ['total', 'amount_paid', 'due_amount', 'gst', 'sub_total', 'total_hours', 'total_course_units']
-        for col in numeric_columns_invoices:
-            if col in invoices_df.columns:
-                invoices_df[col] = pd.to_numeric(invoices_df[col], errors='coerce')
-        
-        numeric_columns_credit = ['Total', 'credit_amount', 'AppliedAmount', 'unapplied_amount']
-        for col in numeric_columns_credit:
-            if col in credit_notes_df.columns:
-                credit_notes_df[col] = pd.to_numeric(credit_notes_df[col], errors='coerce')
-
-        # Normalize/rename payment status values
-        if 'payment_status' in invoices_df.columns:
-            def normalize_payment_status(value: object) -> object:
-                if pd.isna(value):
-                    return value
-                text = str(value).strip()
-                key = text.upper()
-                mapping = {
-                    'P': 'Paid',
-                    'PAID': 'Paid',
-                    'U': 'Unpaid',
-                    'UNPAID': 'Unpaid',
-                    'PP': 'Partially Paid',
-                    'PARTIALLY PAID': 'Partially Paid',
-                    'CD': 'Closed',
-                    'CLOSED': 'Closed',
-                    
-                }
-                return mapping.get(key, text)
-
-            invoices_df['payment_status'] = invoices_df['payment_status'].apply(normalize_payment_status)
-        
-        # Normalize/rename credit status values
-        if 'credit_status' in credit_notes_df.columns:
-            def normalize_credit_status(value: object) -> object:
-                if pd.isna(value):
-                    return value
-                text = str(value).strip()
-                key = text.upper() 
-                mapping = {
-                    'CR': 'Credit',
-                    'CREDIT': 'Credit',
-                    'CD': 'Closed',
-                    'CLOSED': 'Closed',
-                }
-                return mapping.get(key, text)
-
-            credit_notes_df['credit_status'] = credit_notes_df['credit_status'].apply(normalize_credit_status)
-        
+        invoices_df = load_partitions(signatures['invoices'], load_invoices, invoice_date_range)
+        credit_notes_df = load_partitions(signatures['credit_notes'], load_credit_notes)
         return invoices_df, credit_notes_df
     
     except FileNotFoundError as e:
@@ -240,43 +450,210 @@ def load_data():
         st.error(f"Error loading data: {e}")
         return None, None
 
-def calculate_key_metrics(invoices_df, credit_notes_df):
-    """Calculate key financial metrics"""
+@st.fragment(run_every=SOURCE_REFRESH_INTERVAL)
+def watch_source_files():
+    """Rerun the app when a source CSV changes after this session loaded it"""
+    loaded = st.session_state.get('source_signatures')
+    if loaded is not None and source_signatures() != loaded:
+        st.rerun()
+
+def build_offset_index(df, key='user_id'):
+    """Sort rows by key and map each key to the (start, end) offsets of its contiguous block"""
+    keys = pd.to_numeric(df[key], errors='coerce').to_numpy(dtype='float64')
+    order = np.argsort(keys, kind='stable')
+    sorted_df = df.iloc[order].reset_index(drop=True)
+    sorted_keys = keys[order]
+    
+    # NaN keys sort to the end, so the valid keys form a prefix
+    valid_keys = sorted_keys[~np.isnan(sorted_keys)]
+    unique_keys, starts, counts = np.unique(valid_keys, return_index=True, return_counts=True)
+    offsets = {
+        int(k): (int(start), int(start + count))
+        for k, start, count in zip(unique_keys, starts, counts)
+    }
+    return sorted_df, offsets
+
+@st.cache_resource(max_entries=2)
+def build_student_index(invoice_partitions, _credit_notes_df, credit_notes_signature, _loaded_invoices=None):
+    """Per-user_id offset index over both datasets, rebuilt only when a source file changes.
+
+    The full invoice history is only loaded on a rebuild. Cached as a shared
+    resource (no per-session copy), so treat it as read-only.
+    """
+    invoices_df = load_full_history(invoice_partitions, load_invoices, _loaded_invoices)
+    invoices_sorted, invoice_offsets = build_offset_index(invoices_df)
+    credits_sorted, credit_offsets = build_offset_index(_credit_notes_df)
+    
+    # Student names seen on invoices and credit notes, for chart clicks and the lookup box
+    names = {}
+    for df, offsets, name_col in [
+        (credits_sorted, credit_offsets, 'student_name'),
+        (invoices_sorted, invoice_offsets, 'display_name'),
+    ]:
+        if name_col in df.columns:
+            for user_id, (start, _) in offsets.items():
+                names[user_id] = df[name_col].iat[start]
+    
+    # Lookup labels, sorted case-insensitively so a name prefix is one bisect
+    labels = {user_id: f"{name} ({user_id})" for user_id, name in names.items()}
+    search_order = sorted(labels, key=lambda user_id: labels[user_id].lower())
+    
+    return {
+        'invoices': invoices_sorted,
+        'credit_notes': credits_sorted,
+        'invoice_offsets': invoice_offsets,
+        'credit_offsets': credit_offsets,
+        'names': names,
+        'labels': labels,
+        'search_labels': [labels[user_id].lower() for user_id in search_order],
+        'search_ids': search_order,
+    }
+
+def search_students(student_index, query, limit=DRILLDOWN_MATCHES):
+    """user_ids whose label starts with query (case-insensitive), or whose id is query"""
+    query = query.strip().lower()
+    matches = []
+    if query.isdigit() and int(query) in student_index['labels']:
+        matches.append(int(query))
+    
+    search_labels = student_index['search_labels']
+    search_ids = student_index['search_ids']
+    position = bisect.bisect_left(search_labels, query)
+    while (
+        len(matches) < limit and position < len(search_labels)
+        and search_labels[position].startswith(query)
+    ):
+        if search_ids[position] not in matches:
+            matches.append(search_ids[position])
+        position += 1
+    return matches
+
+def student_rows(student_index, user_id):
+    """Return a student's invoices and credit notes as slices of the offset index"""
+    invoices = student_index['invoices']
+    credit_notes = student_index['credit_notes']
+    inv_start, inv_end = student_index['invoice_offsets'].get(user_id, (0, 0))
+    cn_start, cn_end = student_index['credit_offsets'].get(user_id, (0, 0))
+    return invoices.iloc[inv_start:inv_end], credit_notes.iloc[cn_start:cn_end]
+
+def build_daily_series(df, date_col, value_cols):
+    """Daily sums of value columns plus a row count, over a continuous range of days"""
+    days = df[date_col].dt.floor('D')
+    daily = df.groupby(days)[value_cols].sum()
+    daily['count'] = df.groupby(days).size()
+    if daily.empty:
+        return daily
+    return daily.asfreq('D', fill_value=0)
+
+@st.cache_data(max_entries=MAX_CACHED_DAILY_SERIES, show_spinner=False)
+def cached_daily_series(_df, data_key, date_col, value_cols):
+    """Daily series of a frame, built once per data_key (source signature plus any filters)"""
+    return build_daily_series(_df, date_col, value_cols)
+
+def resample_series(daily, granularity):
+    """Roll a daily series up to the chosen granularity"""
+    rule = TREND_GRANULARITIES[granularity][0]
+    if rule == 'D' or daily.empty:
+        return daily
+    return daily.resample(rule, label='left', closed='left').sum()
+
+def lttb_downsample(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: positions of n_out points that keep the line's shape"""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    
+    # First and last points are kept; the rest are split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        
+        # Keep the point forming the largest triangle with the previous pick and the next bucket's average
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+def create_trend_figure(series, granularity, label, color, fill_color):
+    """Amount trend line at the chosen granularity, downsampled and WebGL-rendered when long"""
+    date_format = TREND_GRANULARITIES[granularity][2]
+    x = series.index
+    y = series.to_numpy(dtype='float64')
+    
+    if len(y) > TREND_MAX_POINTS:
+        days = x.to_numpy(dtype='datetime64[s]').astype('float64') / 86400
+        keep = lttb_downsample(days, y, TREND_MAX_POINTS)
+        x, y = x[keep], y[keep]
+    
+    use_webgl = len(y) > WEBGL_MIN_POINTS
+    trace = go.Scattergl if use_webgl else go.Scatter
+    fig = go.Figure()
+    fig.add_trace(trace(
+        x=x,
+        y=y,
+        mode='lines' if use_webgl else 'lines+markers',
+        name=label,
+        line=dict(color=color, width=2 if use_webgl else 3),
+        marker=dict(size=6, color=color),
+        fill='tozeroy',
+        fillcolor=fill_color,
+        hovertemplate=f'<b>%{{x|{date_format}}}</b><br>{label}: $%{{y:,.0f}}<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        xaxis=dict(title=granularity, tickangle=0, tickfont=dict(size=10), showgrid=False),
+        yaxis=dict(title="Amount ($)", tickfont=dict(size=10), tickformat='$,.0f', showgrid=False),
+        hovermode='x unified',
+        showlegend=False,
+        margin=dict(t=40, b=60, l=60, r=20),
+        height=250
+    )
+    return fig
+
+def calculate_key_metrics(invoices_df, credit_notes_df, daily_invoices):
+    """Calculate key financial metrics; trends roll up the precomputed daily invoice series"""
     metrics = {}
     
     # Invoice metrics
     metrics['total_invoices'] = len(invoices_df)
-    metrics['total_invoice_amount'] = round(invoices_df['total'].sum(), 2)
-    metrics['total_amount_paid'] = round(invoices_df['amount_paid'].sum(), 2)
-    metrics['total_outstanding'] = round(invoices_df['due_amount'].sum(), 2)
-    metrics['avg_invoice_amount'] = round(invoices_df['total'].mean(), 2)
+    metrics['total_invoice_amount'] = round(to_dollars(invoices_df['total'].sum()), 2)
+    metrics['total_amount_paid'] = round(to_dollars(invoices_df['amount_paid'].sum()), 2)
+    metrics['total_outstanding'] = round(to_dollars(invoices_df['due_amount'].sum()), 2)
+    metrics['avg_invoice_amount'] = round(to_dollars(invoices_df['total'].mean()), 2)
     
     # Credit note metrics
     metrics['total_credit_notes'] = len(credit_notes_df)
-    metrics['total_credit_amount'] = round(credit_notes_df['Total'].sum(), 2)
-    metrics['total_applied_credit'] = round(credit_notes_df['AppliedAmount'].sum(), 2)
-    metrics['total_unapplied_credit'] = round(credit_notes_df['unapplied_amount'].sum(), 2)
+    metrics['total_credit_amount'] = round(to_dollars(credit_notes_df['Total'].sum()), 2)
+    metrics['total_applied_credit'] = round(to_dollars(credit_notes_df['AppliedAmount'].sum()), 2)
+    metrics['total_unapplied_credit'] = round(to_dollars(credit_notes_df['unapplied_amount'].sum()), 2)
     
     # Payment status analysis
     payment_status_counts = invoices_df['payment_status'].value_counts()
     metrics['payment_status_breakdown'] = payment_status_counts
     
-    # Monthly trends
-    invoices_df['invoice_month'] = invoices_df['invoice_date'].dt.to_period('M')
-    monthly_invoices = invoices_df.groupby('invoice_month').agg({
-        'total': 'sum',
-        'amount_paid': 'sum',
-        'id': 'count'
-    }).reset_index()
-    monthly_invoices['invoice_month'] = monthly_invoices['invoice_month'].astype(str)
-    metrics['monthly_trends'] = monthly_invoices
-    
+    # Daily trends (in cents); every trend granularity is rolled up from these
+    metrics['daily_trends'] = daily_invoices
+
     return metrics
 
-def create_overview_charts(invoices_df, credit_notes_df, metrics):
+def create_overview_charts(invoices_df, credit_notes_df, metrics, granularity='Month'):
     """Create overview charts for the dashboard"""
     # Payment Status Distribution - Compact donut chart
     payment_counts = invoices_df['payment_status'].value_counts()
+    payment_counts = payment_counts[payment_counts > 0]
     
     colors = ['#3b82f6', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6']
     
@@ -301,72 +678,60 @@ def create_overview_charts(invoices_df, credit_notes_df, metrics):
         height=250
     )
     
-    # Yearly Invoice Trends - Compact line chart
-    invoices_df['year'] = invoices_df['invoice_date'].dt.year
-    yearly_data = invoices_df.groupby('year').agg({
-        'total': 'sum',
-        'invoice_number': 'count'
-    }).reset_index()
-
-    fig_trends = go.Figure()
-    fig_trends.add_trace(go.Scatter(
-        x=yearly_data['year'],
-        y=yearly_data['total'],
-        mode='lines+markers',
-        name='Revenue',
-        line=dict(color='#3b82f6', width=3),
-        marker=dict(size=6, color='#3b82f6'),
-        fill='tonexty',
-        fillcolor='rgba(59, 130, 246, 0.1)',
-        hovertemplate='<b>%{x}</b><br>Revenue: $%{y:,.0f}<extra></extra>'
-    ))
-
-    fig_trends.update_layout(
-        xaxis=dict(title="Year", tickangle=0, tickfont=dict(size=10), showgrid=False),
-        yaxis=dict(title="Amount ($)", tickfont=dict(size=10), tickformat='$,.0f', showgrid=False),
-        hovermode='x unified',
-        showlegend=False,
-        margin=dict(t=40, b=60, l=60, r=20),
-        height=250
+    # Revenue Trend - rolled up from the daily series
+    revenue = resample_series(metrics['daily_trends'], granularity)
+    fig_trends = create_trend_figure(
+        to_dollars(revenue['total']), granularity, 'Revenue', '#3b82f6', 'rgba(59, 130, 246, 0.1)'
     )
 
     return fig_payment, fig_trends
 
 def create_financial_analysis(invoices_df, credit_notes_df):
     """Create financial analysis charts"""
-    # Top 10 Students by Invoice Amount - Compact horizontal bar
-    top_students = invoices_df.groupby('display_name')['total'].sum().sort_values(ascending=False).head(10)
+    # Top 10 Students by Invoice Amount - Compact horizontal bar, one bar per
+    # user_id (students can share a name) labelled with the student's name
+    top_students = invoices_df.groupby('user_id', observed=True).agg(
+        total=('total', 'sum'), name=('display_name', 'first')
+    ).sort_values('total', ascending=False).head(10)
+    top_totals = to_dollars(top_students['total'])
+    bar_keys = top_students.index.astype(str)
     
     fig_top_students = go.Figure(data=[go.Bar(
-        x=top_students.values,
-        y=top_students.index,
+        x=top_totals.values,
+        y=bar_keys,
+        customdata=top_students.index.to_numpy(dtype='int64').reshape(-1, 1),
         orientation='h',
         marker=dict(
-            color=top_students.values,
+            color=top_totals.values,
             colorscale='Blues',
             colorbar=dict(thickness=10, len=0.7)
         ),
-        text=top_students.values,
+        text=top_totals.values,
+        hovertext=top_students['name'].astype(str),
         texttemplate='$%{text:,.0f}',
         textposition='outside',
-        hovertemplate='<b>%{y}</b><br>Total: $%{x:,.0f}<extra></extra>'
+        hovertemplate='<b>%{hovertext}</b> (%{customdata[0]})<br>Total: $%{x:,.0f}<extra></extra>'
     )])
     
     fig_top_students.update_layout(
         xaxis=dict(title="Amount ($)", tickfont=dict(size=10), tickformat='$,.0f', showgrid=False),
-        yaxis=dict(title="", tickfont=dict(size=9), showgrid=False),
+        yaxis=dict(
+            title="", tickfont=dict(size=9), showgrid=False,
+            tickmode='array', tickvals=bar_keys, ticktext=top_students['name'].astype(str)
+        ),
         margin=dict(t=40, b=40, l=120, r=40),
         height=300,
         showlegend=False
     )
     
     # Invoice Amount Distribution - Compact histogram with data labels
+    invoice_amounts = to_dollars(invoices_df['total'])
     fig_amount_dist = go.Figure(data=[go.Histogram(
-        x=invoices_df['total'],
+        x=invoice_amounts,
         nbinsx=15,
         marker=dict(color='#3b82f6', opacity=0.7, line=dict(color='#1e40af', width=1)),
         hovertemplate='Range: $%{x}<br>Count: %{y}<extra></extra>',
-        text=invoices_df['total'].value_counts(bins=15).values,
+        text=invoice_amounts.value_counts(bins=15).values,
         texttemplate='%{text}',
         textposition='outside'
     )])
@@ -384,7 +749,7 @@ def create_financial_analysis(invoices_df, credit_notes_df):
     
     for status in invoices_df['payment_status'].unique():
         if pd.notna(status):
-            data = invoices_df[invoices_df['payment_status'] == status]['total']
+            data = invoice_amounts[invoices_df['payment_status'] == status]
             fig_hours_amount.add_trace(go.Box(
                 y=data,
                 name=status,
@@ -403,11 +768,12 @@ def create_financial_analysis(invoices_df, credit_notes_df):
     
     return fig_top_students, fig_amount_dist, fig_hours_amount
 
-def create_credit_note_analysis(credit_notes_df):
-    """Create credit note analysis charts"""
+def create_credit_note_analysis(credit_notes_df, daily_credits, granularity='Month'):
+    """Create credit note analysis charts, rolling the trend up from the daily credit series"""
     
     # Credit Note Status Distribution - Compact donut chart
     status_counts = credit_notes_df['credit_status'].value_counts()
+    status_counts = status_counts[status_counts > 0]
     
     colors = ['#10b981', '#f59e0b', '#ef4444', '#8b5cf6', '#3b82f6']
     
@@ -432,36 +798,234 @@ def create_credit_note_analysis(credit_notes_df):
         height=250
     )
     
-    # Yearly Credit Note Trends - Compact line chart
-    credit_notes_df['year'] = credit_notes_df['Date'].dt.year
-    yearly_credits = credit_notes_df.groupby('year').agg({
-        'Total': 'sum',
-        'CreditNoteNumber': 'count'
-    }).reset_index()
-
-    fig_yearly_credits = go.Figure()
-    fig_yearly_credits.add_trace(go.Scatter(
-        x=yearly_credits['year'],
-        y=yearly_credits['Total'],
-        mode='lines+markers',
-        name='Credit Amount',
-        line=dict(color='#10b981', width=3),
-        marker=dict(size=6, color='#10b981'),
-        fill='tonexty',
-        fillcolor='rgba(16, 185, 129, 0.1)',
-        hovertemplate='<b>%{x}</b><br>Credit Amount: $%{y:,.0f}<extra></extra>'
-    ))
+    # Credit Note Trend - rolled up from the daily series
+    credits = resample_series(daily_credits, granularity)
+    fig_credit_trends = create_trend_figure(
+        to_dollars(credits['Total']), granularity, 'Credit Amount', '#10b981', 'rgba(16, 185, 129, 0.1)'
+    )
 
-    fig_yearly_credits.update_layout(
-        xaxis=dict(title="Year", tickangle=0, tickfont=dict(size=10), showgrid=False),
-        yaxis=dict(title="Amount ($)", tickfont=dict(size=10), tickformat='$,.0f', showgrid=False),
-        hovermode='x unified',
-        showlegend=False,
-        margin=dict(t=40, b=60, l=60, r=20),
-        height=250
+    return fig_credit_status, fig_credit_trends
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only stream that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def export_chunk(chunk):
+    """Copy of an export chunk with money columns back in dollars"""
+    chunk = chunk.copy()
+    for col in MONEY_COLUMNS_INVOICES + MONEY_COLUMNS_CREDIT:
+        if col in chunk.columns:
+            chunk[col] = to_dollars(chunk[col])
+    return chunk
+
+def iter_export_chunks(df, file_format, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield the frame serialized as CSV or Parquet, one block of rows at a time"""
+    if file_format == 'CSV':
+        if df.empty:
+            yield df.to_csv(index=False).encode('utf-8')
+        for start in range(0, len(df), chunk_rows):
+            chunk = export_chunk(df.iloc[start:start + chunk_rows])
+            yield chunk.to_csv(index=False, header=start == 0).encode('utf-8')
+    elif file_format == 'Parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        sink = _ChunkSink()
+        # Schema comes from the whole frame so sparse columns keep their type
+        schema = pa.Schema.from_pandas(df, preserve_index=False).remove_metadata()
+        for col in MONEY_COLUMNS_INVOICES + MONEY_COLUMNS_CREDIT:
+            if col in schema.names:
+                schema = schema.set(schema.get_field_index(col), pa.field(col, pa.float64()))
+        with pq.ParquetWriter(sink, schema) as writer:
+            for start in range(0, len(df), chunk_rows):
+                chunk = export_chunk(df.iloc[start:start + chunk_rows])
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                yield sink.drain()
+        yield sink.drain()
+    else:
+        raise ValueError(f"Unsupported export format: {file_format}")
+
+@st.fragment
+def export_filtered_view(invoices_df, credit_notes_df):
+    """Sidebar export of the filtered invoices or credit notes to CSV/Parquet"""
+    st.header(" Export")
+    dataset = st.selectbox("Dataset", ["Invoices", "Credit Notes"], key='export_dataset')
+    file_format = st.selectbox("Format", ["CSV", "Parquet"], key='export_format')
+    
+    if st.button("Prepare export", key='export_prepare'):
+        df = invoices_df if dataset == "Invoices" else credit_notes_df
+        # download_button holds the finished file in memory while the button is
+        # shown, so an export costs its full size in worker memory; chunking only
+        # bounds the intermediate dollar-converted copies to EXPORT_CHUNK_ROWS
+        data = b''.join(iter_export_chunks(df, file_format))
+        
+        extension = 'csv' if file_format == 'CSV' else 'parquet'
+        mime = 'text/csv' if file_format == 'CSV' else 'application/octet-stream'
+        file_stem = 'invoices' if dataset == "Invoices" else 'credit_notes'
+        st.download_button(
+            f"Download {len(df):,} rows",
+            data=data,
+            file_name=f"{file_stem}_{datetime.now():%Y%m%d_%H%M%S}.{extension}",
+            mime=mime,
+            key='export_download'
+        )
+
+def render_student_drilldown(student_index):
+    """Show one student's invoices, credit notes, balance and history"""
+    labels = student_index['labels']
+    if not labels:
+        st.info("No students found.")
+        return
+    
+    # Only the matches for the typed prefix are offered, so a rerun stays O(matches)
+    query = st.text_input(
+        "Find a student",
+        placeholder="Start of a name, or a user ID",
+        key='drilldown_query'
+    )
+    options = search_students(student_index, query)
+    
+    # The pick is kept outside the widget, which is recreated whenever its options change
+    selected = st.session_state.get('drilldown_user_id')
+    if selected not in labels:
+        selected = None
+    elif selected not in options:
+        options.insert(0, selected)
+    
+    user_id = st.selectbox(
+        "Student",
+        options,
+        index=None if selected is None else options.index(selected),
+        format_func=labels.__getitem__,
+        placeholder="Pick a match or click a bar above"
     )
+    st.session_state['drilldown_user_id'] = user_id
+    if user_id is None:
+        return
+    
+    student_invoices, student_credits = student_rows(student_index, user_id)
+    
+    total_invoiced = to_dollars(student_invoices['total'].sum())
+    total_paid = to_dollars(student_invoices['amount_paid'].sum())
+    outstanding = to_dollars(student_invoices['due_amount'].sum())
+    total_credit = to_dollars(student_credits['Total'].sum())
+    unapplied_credit = to_dollars(student_credits['unapplied_amount'].sum())
+    balance = outstanding - unapplied_credit
+    
+    kpi_cols = st.columns(5)
+    for col, (label, value) in zip(kpi_cols, [
+        ("Invoiced", total_invoiced),
+        ("Paid", total_paid),
+        ("Outstanding", outstanding),
+        ("Credit Notes", total_credit),
+        ("Balance", balance),
+    ]):
+        with col:
+            st.markdown(f'''
+                <div class="kpi-card" style="text-align:center;">
+                    <div style="font-size:0.9rem; color:#6b7280; font-weight:600; margin-bottom:0.5rem;">{label}</div>
+                    <div style="font-size:1.8rem; font-weight:800; color:#1f2937;">{format_currency_compact(value)}</div>
+                </div>
+            ''', unsafe_allow_html=True)
+    
+    # Combined history, newest first
+    invoice_history = pd.DataFrame({
+        'Date': student_invoices['invoice_date'],
+        'Type': 'Invoice',
+        'Number': student_invoices['invoice_number'],
+        'Amount': to_dollars(student_invoices['total']),
+        'Status': student_invoices['payment_status'],
+    })
+    credit_history = pd.DataFrame({
+        'Date': student_credits['Date'],
+        'Type': 'Credit Note',
+        'Number': student_credits['CreditNoteNumber'],
+        'Amount': -to_dollars(student_credits['Total']),
+        'Status': student_credits['credit_status'],
+    })
+    history = pd.concat([invoice_history, credit_history], ignore_index=True)
+    history = history.sort_values('Date', ascending=False)
+    
+    st.subheader(f"History ({len(student_invoices):,} invoices, {len(student_credits):,} credit notes)")
+    st.dataframe(history, use_container_width=True, height=300, hide_index=True)
+
+@st.cache_data(max_entries=2)
+def cached_reconciliation(invoice_partitions, _credit_notes_df, credit_notes_signature, _loaded_invoices=None):
+    """Reconcile credit notes against every invoice once per version of the source files"""
+    invoices_df = load_full_history(invoice_partitions, load_invoices, _loaded_invoices)
+    # Money is held in cents here, so the one-cent tolerance is 1
+    return reconcile_credit_notes(invoices_df, _credit_notes_df, tolerance=1)
+
+@st.cache_data(max_entries=2)
+def cached_invoice_memory_report(invoice_partitions, _loaded_invoices=None):
+    """Per-column memory of the full invoice history once per version of the source files"""
+    return column_memory_report(load_full_history(invoice_partitions, load_invoices, _loaded_invoices))
+
+def render_reconciliation(credit_note_issues, over_credited):
+    """Show credit notes that disagree with their invoice and over-credited invoices"""
+    excess_credit = to_dollars(over_credited['excess'].sum()) if len(over_credited) else 0.0
+    
+    recon_cols = st.columns(3)
+    for col, label, value in zip(recon_cols, [
+        "Credit Notes with Issues", "Over-credited Invoices", "Excess Credit"
+    ], [
+        f"{len(credit_note_issues):,}", f"{len(over_credited):,}", format_currency_compact(excess_credit)
+    ]):
+        with col:
+            st.markdown(f'''
+                <div class="kpi-card" style="text-align:center;">
+                    <div style="font-size:0.9rem; color:#6b7280; font-weight:600; margin-bottom:0.5rem;">{label}</div>
+                    <div style="font-size:1.8rem; font-weight:800; color:#1f2937;">{value}</div>
+                </div>
+            ''', unsafe_allow_html=True)
+    
+    issues_tab, over_credited_tab = st.tabs(["Credit Notes with Issues", "Over-credited Invoices"])
+    
+    with issues_tab:
+        display_issues = credit_note_issues[[
+            'CreditNoteNumber', 'InvoiceNumber', 'invoice_number', 'user_id', 'invoice_user_id',
+            'Total', 'invoice_total', 'issues'
+        ]].copy()
+        display_issues['Total'] = to_dollars(display_issues['Total'])
+        display_issues['invoice_total'] = to_dollars(display_issues['invoice_total'])
+        display_issues.columns = [
+            'Credit #', 'Invoice # (credit)', 'Invoice # (invoice)', 'Student ID (credit)',
+            'Student ID (invoice)', 'Credit Amount', 'Invoice Amount', 'Issues'
+        ]
+        st.dataframe(display_issues, use_container_width=True, height=300, hide_index=True)
+    
+    with over_credited_tab:
+        display_over = over_credited[[
+            'invoice_number', 'invoice_total', 'credit_notes', 'credited', 'applied', 'excess'
+        ]].copy()
+        for col in ['invoice_total', 'credited', 'applied', 'excess']:
+            display_over[col] = to_dollars(display_over[col])
+        display_over.columns = ['Invoice #', 'Invoice Amount', 'Credit Notes', 'Credited', 'Applied', 'Excess']
+        st.dataframe(display_over, use_container_width=True, height=300, hide_index=True)
 
-    return fig_credit_status, fig_yearly_credits
+@st.cache_data(max_entries=2 * len(TREND_GRANULARITIES))
+def cached_credit_note_analysis(_credit_notes_df, _daily_credits, credit_notes_signature, granularity='Month'):
+    """Memoize the credit note charts until the credit notes file changes"""
+    return create_credit_note_analysis(_credit_notes_df, _daily_credits, granularity)
 
 def main():
     """Main dashboard function"""
@@ -469,19 +1033,46 @@ def main():
     # Header
     st.markdown('<h1 class="dashboard-title"> Funding Invoice Dashboard</h1>', unsafe_allow_html=True)
     
+    signatures = source_signatures()
+    st.session_state['source_signatures'] = signatures
+    watch_source_files()
+    
+    # Sidebar filters
+    st.sidebar.header(" Filters")
+    
+    # With monthly partitions the date range is known before loading, so the
+    # KPIs and charts only read the partitions overlapping it
+    date_range = None
+    invoice_date_range = None
+    partition_bounds = partition_date_bounds(signatures['invoices'])
+    if partition_bounds is not None:
+        min_date, max_date = partition_bounds
+        date_range = st.sidebar.date_input(
+            "Select Date Range",
+            value=(min_date, max_date),
+            min_value=min_date,
+            max_value=max_date
+        )
+        if len(date_range) == 2:
+            invoice_date_range = tuple(date_range)
+    
     # Load data
     with st.spinner('Loading data...'):
-        invoices_df, credit_notes_df = load_data()
+        invoices_df, credit_notes_df = load_data(signatures, invoice_date_range)
     
     if invoices_df is None or credit_notes_df is None:
         st.error("Failed to load data. Please ensure the CSV files are in the correct directory.")
         return
     
-    # Sidebar filters
-    st.sidebar.header(" Filters")
+    # The drill-down and reconciliation need every invoice; when nothing was
+    # pruned the loaded frame already is the full history and is reused
+    invoice_partitions = signatures['invoices']
+    loaded_invoices = None
+    if len(select_partitions(invoice_partitions, invoice_date_range)) == len(invoice_partitions):
+        loaded_invoices = invoices_df
     
     # Date range filter
-    if 'invoice_date' in invoices_df.columns:
+    if partition_bounds is None and 'invoice_date' in invoices_df.columns:
         min_date = invoices_df['invoice_date'].min()
         max_date = invoices_df['invoice_date'].max()
         
@@ -491,7 +1082,8 @@ def main():
             min_value=min_date,
             max_value=max_date
         )
-        
+    
+    if date_range is not None and 'invoice_date' in invoices_df.columns:
         if len(date_range) == 2:
             start_date, end_date = date_range
             invoices_df = invoices_df[
@@ -500,7 +1092,7 @@ def main():
             ]
     
     # Payment status filter
-    payment_statuses = invoices_df['payment_status'].unique()
+    payment_statuses = invoices_df['payment_status'].unique().tolist()
     selected_statuses = st.sidebar.multiselect(
         "Payment Status",
         payment_statuses,
@@ -508,8 +1100,22 @@ def main():
     )
     invoices_df = invoices_df[invoices_df['payment_status'].isin(selected_statuses)]
     
+    # Export the filtered view
+    with st.sidebar:
+        export_filtered_view(invoices_df, credit_notes_df)
+    
+    # Daily series behind the trend charts, built once per data version and filter;
+    # switching granularity only resamples them
+    daily_invoices = cached_daily_series(
+        invoices_df,
+        (signatures['invoices'], tuple(date_range or ()), tuple(selected_statuses)),
+        'invoice_date',
+        ['total', 'amount_paid'],
+    )
+    daily_credits = cached_daily_series(credit_notes_df, signatures['credit_notes'], 'Date', ['Total'])
+    
     # Calculate metrics
-    metrics = calculate_key_metrics(invoices_df, credit_notes_df)
+    metrics = calculate_key_metrics(invoices_df, credit_notes_df, daily_invoices)
     
     # KPI Section - Clean 4x2 layout with better spacing
     st.header(" Key Performance Indicators")
@@ -590,10 +1196,22 @@ def main():
     # Charts Section - Clean 2x2 grid layout
     st.header(" Analytics Dashboard")
     
+    # Trend granularity shared by the revenue and credit trend charts
+    granularity = st.radio(
+        "Trend granularity",
+        list(TREND_GRANULARITIES),
+        index=list(TREND_GRANULARITIES).index('Month'),
+        horizontal=True,
+        key='trend_granularity'
+    )
+    granularity_label = TREND_GRANULARITIES[granularity][1]
+    
     # Get all charts
-    fig_payment_status, fig_monthly_trends = create_overview_charts(invoices_df, credit_notes_df, metrics)
+    fig_payment_status, fig_revenue_trend = create_overview_charts(invoices_df, credit_notes_df, metrics, granularity)
     fig_top_students, fig_amount_dist, fig_hours_amount = create_financial_analysis(invoices_df, credit_notes_df)
-    fig_credit_status, fig_monthly_credits = create_credit_note_analysis(credit_notes_df)
+    fig_credit_status, fig_credit_trend = cached_credit_note_analysis(
+        credit_notes_df, daily_credits, signatures['credit_notes'], granularity
+    )
     
     # First row of charts
     chart_row1_col1, chart_row1_col2 = st.columns(2)
@@ -603,8 +1221,8 @@ def main():
         st.plotly_chart(fig_payment_status, use_container_width=True, config={'displayModeBar': False})
     
     with chart_row1_col2:
-        st.subheader("Monthly Revenue Trend")
-        st.plotly_chart(fig_monthly_trends, use_container_width=True, config={'displayModeBar': False})
+        st.subheader(f"{granularity_label} Revenue Trend")
+        st.plotly_chart(fig_revenue_trend, use_container_width=True, config={'displayModeBar': False})
     
     # Second row of charts
     chart_row2_col1, chart_row2_col2 = st.columns(2)
@@ -625,14 +1243,46 @@ def main():
         st.plotly_chart(fig_credit_status, use_container_width=True, config={'displayModeBar': False})
     
     with chart_row3_col2:
-        st.subheader("Monthly Credit Trends")
-        st.plotly_chart(fig_monthly_credits, use_container_width=True, config={'displayModeBar': False})
+        st.subheader(f"{granularity_label} Credit Trends")
+        st.plotly_chart(fig_credit_trend, use_container_width=True, config={'displayModeBar': False})
     
     st.markdown("---")
     
     # Top Students Chart - Full width
     st.header(" Top Students by Revenue")
-    st.plotly_chart(fig_top_students, use_container_width=True, config={'displayModeBar': False})
+    top_students_event = st.plotly_chart(
+        fig_top_students,
+        use_container_width=True,
+        config={'displayModeBar': False},
+        on_select="rerun",
+        selection_mode="points",
+        key='top_students_chart'
+    )
+    
+    # Student drill-down over every invoice, independent of the date filter
+    st.header(" Student Drill-down")
+    student_index = build_student_index(
+        invoice_partitions, credit_notes_df, signatures['credit_notes'], loaded_invoices
+    )
+    
+    # A newly clicked bar selects that student (by the bar's user_id) in the lookup box
+    selected_points = top_students_event.selection.points
+    picked_id = int(selected_points[0]['customdata'][0]) if selected_points else None
+    if picked_id != st.session_state.get('top_students_last_pick'):
+        st.session_state['top_students_last_pick'] = picked_id
+        if picked_id in student_index['names']:
+            st.session_state['drilldown_user_id'] = picked_id
+    
+    render_student_drilldown(student_index)
+    
+    st.markdown("---")
+    
+    # Credit notes reconciled against every invoice, independent of the date filter
+    st.header(" Credit Note Reconciliation")
+    credit_note_issues, over_credited = cached_reconciliation(
+        invoice_partitions, credit_notes_df, signatures['credit_notes'], loaded_invoices
+    )
+    render_reconciliation(credit_note_issues, over_credited)
     
     st.markdown("---")
     
@@ -646,6 +1296,7 @@ def main():
         recent_invoices = invoices_df.sort_values('created', ascending=False).head(8)
         display_columns = ['invoice_number', 'display_name', 'total', 'payment_status']
         display_df = recent_invoices[display_columns].copy()
+        display_df['total'] = to_dollars(display_df['total'])
         display_df.columns = ['Invoice #', 'Student', 'Amount', 'Status']
         st.dataframe(display_df, use_container_width=True, height=300)
     
@@ -654,8 +1305,20 @@ def main():
         recent_credits = credit_notes_df.sort_values('created', ascending=False).head(8)
         display_columns_credit = ['CreditNoteNumber', 'student_name', 'Total', 'credit_status']
         display_df_credit = recent_credits[display_columns_credit].copy()
+        display_df_credit['Total'] = to_dollars(display_df_credit['Total'])
         display_df_credit.columns = ['Credit #', 'Student', 'Amount', 'Status']
         st.dataframe(display_df_credit, use_container_width=True, height=300)
+    
+    # Resident memory of the full invoice history and the credit notes
+    with st.expander("Memory Usage"):
+        memory_col1, memory_col2 = st.columns(2)
+        for col, name, report in [
+            (memory_col1, "Invoices", cached_invoice_memory_report(invoice_partitions, loaded_invoices)),
+            (memory_col2, "Credit Notes", column_memory_report(credit_notes_df)),
+        ]:
+            with col:
+                st.subheader(f"{name}: {report['Memory_MB'].sum():.2f} MB")
+                st.dataframe(report, use_container_width=True, height=300, hide_index=True)
 
 
 if __name__ == "__main__":
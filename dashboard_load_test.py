@@ -0,0 +1,243 @@
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import app_test
+
+DASHBOARD_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dashboard.py')
+PAYMENT_STATUS_CODES = ['P', 'U', 'PP', 'CD']
+CREDIT_STATUS_CODES = ['CR', 'CD']
+
+def generate_synthetic_data(directory, invoice_rows, credit_note_rows, seed=0):
+    """Write synthetic funding_invoices.csv and funding_invoice_credit_notes.csv into directory"""
+    rng = np.random.default_rng(seed)
+
+    # Invoices
+    user_ids = rng.integers(10_000, 10_000 + max(invoice_rows // 3, 1), invoice_rows)
+    invoice_dates = pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 3650, invoice_rows), unit='D')
+    sub_totals = rng.choice([950.0, 1840.0, 3416.0, 10464.6], invoice_rows)
+    gst = np.zeros(invoice_rows)
+    totals = sub_totals + gst
+    amount_paid = np.where(rng.random(invoice_rows) < 0.6, totals, 0.0)
+    invoices_df = pd.DataFrame({
+        'id': np.arange(1, invoice_rows + 1),
+        'invoice_number': [f"F{100_000 + i}" for i in range(invoice_rows)],
+        'user_id': user_ids,
+        'display_name': [f"Student {user_id}" for user_id in user_ids],
+        'invoice_date': invoice_dates.strftime('%Y-%m-%d'),
+        'due_date': (invoice_dates + pd.Timedelta(days=30)).strftime('%Y-%m-%d'),
+        'sub_total': sub_totals,
+        'gst': gst,
+        'total': totals,
+        'amount_paid': amount_paid,
+        'due_amount': totals - amount_paid,
+        'total_hours': rng.integers(1, 200, invoice_rows),
+        'total_course_units': rng.integers(1, 12, invoice_rows),
+        'payment_status': rng.choice(PAYMENT_STATUS_CODES, invoice_rows),
+        'created': invoice_dates.strftime('%Y-%m-%d 09:00:00'),
+        'modified': invoice_dates.strftime('%Y-%m-%d 09:00:00'),
+    })
+
+    # Credit notes, each against a random invoice
+    invoice_positions = rng.integers(0, invoice_rows, credit_note_rows)
+    credit_totals = np.round(totals[invoice_positions] * rng.random(credit_note_rows), 2)
+    applied = np.where(rng.random(credit_note_rows) < 0.8, credit_totals, 0.0)
+    credit_dates = invoice_dates[invoice_positions] + pd.to_timedelta(rng.integers(0, 90, credit_note_rows), unit='D')
+    credit_notes_df = pd.DataFrame({
+        'id': np.arange(1, credit_note_rows + 1),
+        'funding_invoice_id': invoices_df['id'].to_numpy()[invoice_positions],
+        'InvoiceNumber': invoices_df['invoice_number'].to_numpy()[invoice_positions],
+        'Date': credit_dates.strftime('%Y-%m-%d'),
+        'credit_status': rng.choice(CREDIT_STATUS_CODES, credit_note_rows),
+        'Total': credit_totals,
+        'sub_total': credit_totals,
+        'AppliedAmount': applied,
+        'unapplied_amount': credit_totals - applied,
+        'credit_amount': 0.0,
+        'CreditNoteNumber': [f"FCN{100_000 + i}" for i in range(credit_note_rows)],
+        'user_id': user_ids[invoice_positions],
+        'student_name': invoices_df['display_name'].to_numpy()[invoice_positions],
+        'created': credit_dates.strftime('%Y-%m-%d 09:00:00'),
+        'modified': credit_dates.strftime('%Y-%m-%d 09:00:00'),
+    })
+
+    invoices_df.to_csv(os.path.join(directory, 'funding_invoices.csv'), index=False)
+    credit_notes_df.to_csv(os.path.join(directory, 'funding_invoice_credit_notes.csv'), index=False)
+
+def share_test_runtime():
+    """Let AppTest sessions run concurrently against one shared mock runtime.
+
+    Each AppTest run installs its own mock as the global Runtime instance and
+    clears it afterwards, which breaks any session still running. Pointing
+    AppTest at a Runtime subclass makes those assignments land on the
+    subclass, while all sessions share one runtime, as they do on a server.
+    """
+    class SessionRuntime(Runtime):
+        pass
+
+    shared_runtime = MagicMock(spec=Runtime)
+    shared_runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared_runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = shared_runtime
+    app_test.Runtime = SessionRuntime
+
+def generate_in_subprocess(directory, invoice_rows, credit_note_rows, seed):
+    """Generate the synthetic data in a child process, so its footprint stays out of this process's peak RSS"""
+    process = multiprocessing.get_context('spawn').Process(
+        target=generate_synthetic_data, args=(directory, invoice_rows, credit_note_rows, seed)
+    )
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"Synthetic data generation failed with exit code {process.exitcode}")
+
+def simulate_session(session_id, reruns, timeout, seed):
+    """Open one dashboard session and change filters.
+
+    Returns the first page load's latency and each filter-change rerun's
+    latency, in seconds.
+    """
+    rng = random.Random(seed + session_id)
+    at = AppTest.from_file(DASHBOARD_SCRIPT, default_timeout=timeout)
+    latencies = []
+
+    start = time.perf_counter()
+    at.run()
+    first_load = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"Session {session_id} failed: {at.exception[0].value}")
+
+    for _ in range(reruns):
+        if rng.random() < 0.5:
+            # Narrow the date range to a random window inside the available bounds
+            date_input = at.date_input[0]
+            min_date, max_date = date_input.min, date_input.max
+            span_days = (max_date - min_date).days
+            start_offset = rng.randint(0, max(span_days - 1, 0))
+            end_offset = rng.randint(start_offset, span_days)
+            date_input.set_value((
+                min_date + pd.Timedelta(days=start_offset),
+                min_date + pd.Timedelta(days=end_offset),
+            ))
+        else:
+            # Pick a random non-empty subset of payment statuses
+            multiselect = at.multiselect[0]
+            options = list(multiselect.options)
+            multiselect.set_value(rng.sample(options, rng.randint(1, len(options))))
+
+        start = time.perf_counter()
+        at.run()
+        latencies.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(f"Session {session_id} failed: {at.exception[0].value}")
+
+    return first_load, latencies
+
+def peak_memory_mb():
+    """Peak resident memory of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+
+def run_load_test(sessions, reruns, invoice_rows, credit_note_rows, timeout=120, seed=0):
+    """Run concurrent dashboard sessions over synthetic data and return the latency summary"""
+
+    print("=" * 80)
+    print("DASHBOARD LOAD TEST")
+    print("=" * 80)
+
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as data_dir:
+        generate_in_subprocess(data_dir, invoice_rows, credit_note_rows, seed)
+        print(f"\nSynthetic data: {invoice_rows:,} invoices, {credit_note_rows:,} credit notes")
+        print(f"Sessions: {sessions} concurrent, {reruns} filter changes each")
+
+        # The dashboard reads its CSVs relative to the working directory
+        os.chdir(data_dir)
+        share_test_runtime()
+        try:
+            # Warm the shared data cache so every session measures interactive reruns
+            simulate_session(-1, 0, timeout, seed)
+            memory_before = peak_memory_mb()
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=sessions) as executor:
+                results = list(executor.map(
+                    lambda session_id: simulate_session(session_id, reruns, timeout, seed),
+                    range(sessions)
+                ))
+            wall_time = time.perf_counter() - start
+        finally:
+            os.chdir(original_dir)
+
+    # First page loads are reported apart from the filter-change reruns
+    first_loads = np.array([first_load for first_load, _ in results]) * 1000
+    latencies = np.array([latency for _, session in results for latency in session]) * 1000
+    summary = {
+        'sessions': sessions,
+        'first_load_p50_ms': np.percentile(first_loads, 50),
+        'first_load_max_ms': first_loads.max(),
+        'reruns': len(latencies),
+        'p50_ms': np.percentile(latencies, 50),
+        'p95_ms': np.percentile(latencies, 95),
+        'p99_ms': np.percentile(latencies, 99),
+        'max_ms': latencies.max(),
+        'throughput_per_s': (len(latencies) + len(first_loads)) / wall_time,
+        'peak_memory_mb': peak_memory_mb(),
+        'warm_memory_mb': memory_before,
+    }
+
+    print(f"\nFIRST PAGE LOAD ({summary['sessions']} sessions):")
+    print(f"   p50: {summary['first_load_p50_ms']:,.0f} ms")
+    print(f"   max: {summary['first_load_max_ms']:,.0f} ms")
+
+    print(f"\nRERUN LATENCY ({summary['reruns']:,} filter changes):")
+    print(f"   p50: {summary['p50_ms']:,.0f} ms")
+    print(f"   p95: {summary['p95_ms']:,.0f} ms")
+    print(f"   p99: {summary['p99_ms']:,.0f} ms")
+    print(f"   max: {summary['max_ms']:,.0f} ms")
+    print(f"   Throughput: {summary['throughput_per_s']:.1f} runs/s (page loads and reruns)")
+
+    print(f"\nMEMORY:")
+    print(f"   Peak after warm-up: {summary['warm_memory_mb']:,.0f} MB")
+    print(f"   Peak under load: {summary['peak_memory_mb']:,.0f} MB")
+
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test concurrent dashboard sessions with Streamlit's AppTest")
+    parser.add_argument('--sessions', type=int, default=8, help="concurrent sessions")
+    parser.add_argument('--reruns', type=int, default=10, help="filter changes per session")
+    parser.add_argument('--invoices', type=int, default=50_000, help="synthetic invoice rows")
+    parser.add_argument('--credit-notes', type=int, default=10_000, help="synthetic credit note rows")
+    parser.add_argument('--timeout', type=float, default=120, help="seconds allowed per rerun")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-p95-ms', type=float, help="exit non-zero when p95 latency exceeds this")
+    args = parser.parse_args()
+    if args.reruns < 1:
+        parser.error("--reruns must be at least 1")
+
+    summary = run_load_test(
+        args.sessions, args.reruns, args.invoices, args.credit_notes, args.timeout, args.seed
+    )
+
+    if args.max_p95_ms is not None and summary['p95_ms'] > args.max_p95_ms:
+        print(f"\nFAILED: p95 latency {summary['p95_ms']:,.0f} ms exceeds {args.max_p95_ms:,.0f} ms")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
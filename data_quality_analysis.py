@@ -1,40 +1,129 @@
 import pandas as pd
 import numpy as np
+import argparse
+import hashlib
+import json
+import os
+import re
+from difflib import SequenceMatcher
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-def analyze_data_quality():
-    """Comprehensive data quality analysis for both datasets"""
+# Source data: a single CSV, or a directory of monthly partition files
+# named like 2024-01.csv (or funding_invoices_2024-01.csv) when present
+INVOICES_FILE = 'funding_invoices.csv'
+INVOICES_PARTITION_DIR = 'funding_invoices'
+CREDIT_NOTES_FILE = 'funding_invoice_credit_notes.csv'
+CREDIT_NOTES_PARTITION_DIR = 'funding_invoice_credit_notes'
+LOAD_WORKERS = min(8, os.cpu_count() or 1)
+
+# Where per-partition profiles and the score history are persisted
+PROFILE_STORE_DIR = 'quality_profiles'
+PROFILE_PARTITION_COLUMN = 'created'
+# Bump when profile_partition() changes what it counts, so stored profiles are redone
+PROFILE_FORMAT_VERSION = 3
+
+# Identity matching: names at least this similar are treated as the same student
+NAME_SIMILARITY_THRESHOLD = 0.9
+# Names are blocked on their leading characters, trailing characters, both ends
+# together, and each whole token; blocks larger than MAX_BLOCK_SIZE are split on
+# a longer key, and blocks that a longer key cannot split are skipped and reported
+NAME_BLOCK_KEY_LENGTH = 8
+MAX_BLOCK_SIZE = 50
+
+# Reconciliation exceptions are written here for finance
+RECONCILIATION_OUTPUT_DIR = 'reconciliation'
+
+# Money amounts are compared to the cent
+RULE_TOLERANCE = 0.01
+
+# Accounting identities carried by each dataset. Each rule compares two
+# column expressions with ==, <= or >= (within the tolerance).
+INVOICE_RULES = [
+    {'name': 'total = sub_total + gst', 'lhs': 'total', 'rhs': 'sub_total + gst'},
+    {'name': 'due_amount = total - amount_paid', 'lhs': 'due_amount', 'rhs': 'total - amount_paid'},
+    {'name': 'amount_paid <= total', 'lhs': 'amount_paid', 'op': '<=', 'rhs': 'total'},
+    {'name': 'amount_paid >= 0', 'lhs': 'amount_paid', 'op': '>=', 'rhs': '0'},
+]
+
+CREDIT_NOTE_RULES = [
+    {'name': 'AppliedAmount + unapplied_amount = Total', 'lhs': 'AppliedAmount + unapplied_amount', 'rhs': 'Total'},
+    {'name': 'sub_total = fee components', 'lhs': 'sub_total', 'rhs': 'total_unit_rpl_fee + total_resource_fee + total_misc_fee'},
+    {'name': 'Total = sub_total - discounts + gst', 'lhs': 'Total', 'rhs': 'sub_total - discount_amount - scholarship_amount + gst_amount'},
+    {'name': 'AppliedAmount <= Total', 'lhs': 'AppliedAmount', 'op': '<=', 'rhs': 'Total'},
+]
+
+def analyze_data_quality(incremental=False):
+    """Comprehensive data quality analysis for both datasets.
+
+    With incremental=True only the per-partition profiles are refreshed: the
+    missing value, duplicate and rule sections come from the merged profiles,
+    and the full-history checks (column details, relationships,
+    reconciliation, identity matching) are skipped.
+    """
     
     print("=" * 80)
     print("DATA QUALITY ANALYSIS REPORT")
     print("=" * 80)
     
-    # Load datasets
+    # Load datasets; incremental mode only reads new or changed partitions
+    invoices_df = credit_notes_df = None
     try:
-        invoices_df = pd.read_csv('funding_invoices.csv')
-        credit_notes_df = pd.read_csv('funding_invoice_credit_notes.csv')
+        if not incremental:
+            invoices_df = read_source(INVOICES_FILE, INVOICES_PARTITION_DIR)
+            credit_notes_df = read_source(CREDIT_NOTES_FILE, CREDIT_NOTES_PARTITION_DIR)
+        
+        # Missing values, duplicates and rule violations, reprofiling only changed partitions
+        invoice_profile = incremental_profile(
+            INVOICES_FILE, INVOICES_PARTITION_DIR, 'invoices', INVOICE_RULES, df=invoices_df
+        )
+        credit_profile = incremental_profile(
+            CREDIT_NOTES_FILE, CREDIT_NOTES_PARTITION_DIR, 'credit_notes', CREDIT_NOTE_RULES, df=credit_notes_df
+        )
         print("SUCCESS: Successfully loaded both datasets")
     except Exception as e:
         print(f"ERROR: Error loading data: {e}")
         return
     
     print(f"\nDATASET OVERVIEW")
-    print(f"Funding Invoices: {len(invoices_df):,} rows × {len(invoices_df.columns)} columns")
-    print(f"Credit Notes: {len(credit_notes_df):,} rows × {len(credit_notes_df.columns)} columns")
+    print(f"Funding Invoices: {invoice_profile['rows']:,} rows × {invoice_profile['columns']} columns")
+    print(f"Credit Notes: {credit_profile['rows']:,} rows × {credit_profile['columns']} columns")
+    
+    if incremental:
+        for name, profile in [("Funding Invoices", invoice_profile), ("Credit Notes", credit_profile)]:
+            print("\n" + "="*50)
+            print(f"{name.upper()} PROFILE")
+            print("="*50)
+            
+            report_profile(profile, name)
+        
+        print(f"\n   Relationships, reconciliation and identity matching skipped (incremental mode)")
+    else:
+        analyze_full_history(invoices_df, credit_notes_df, invoice_profile, credit_profile)
+    
+    # Overall data quality summary
+    print("\n" + "="*50)
+    print("OVERALL DATA QUALITY SUMMARY")
+    print("="*50)
+    
+    provide_quality_summary(invoice_profile, credit_profile)
+
+def analyze_full_history(invoices_df, credit_notes_df, invoice_profile, credit_profile):
+    """Report sections that need every row of both datasets"""
     
     # Analyze funding_invoices.csv 
     print("\n" + "="*50)
     print("FUNDING INVOICES ANALYSIS")
     print("="*50)
     
-    analyze_dataset(invoices_df, "Funding Invoices")
+    analyze_dataset(invoices_df, "Funding Invoices", invoice_profile)
     
     # Analyze funding_invoice_credit_notes.csv
     print("\n" + "="*50)
     print("CREDIT NOTES ANALYSIS")
     print("="*50)
     
-    analyze_dataset(credit_notes_df, "Credit Notes")
+    analyze_dataset(credit_notes_df, "Credit Notes", credit_profile)
     
     # Cross-dataset relationship analysis
     print("\n" + "="*50)
@@ -43,15 +132,52 @@ def analyze_data_quality():
     
     analyze_relationships(invoices_df, credit_notes_df)
     
-    # Overall data quality summary
+    # Credit notes against the invoices they reference
     print("\n" + "="*50)
-    print("OVERALL DATA QUALITY SUMMARY")
+    print("CREDIT NOTE RECONCILIATION")
     print("="*50)
     
-    provide_quality_summary(invoices_df, credit_notes_df)
+    report_reconciliation(invoices_df, credit_notes_df)
+    
+    # Student identity matching across both datasets
+    print("\n" + "="*50)
+    print("IDENTITY MATCHING")
+    print("="*50)
+    
+    report_identity_conflicts(invoices_df, credit_notes_df)
+    
+    # Accounting identities
+    print("\n" + "="*50)
+    print("FINANCIAL VALIDATION RULES")
+    print("="*50)
+    
+    report_rule_violations(invoices_df, INVOICE_RULES, "Funding Invoices")
+    report_rule_violations(credit_notes_df, CREDIT_NOTE_RULES, "Credit Notes")
+
+def list_partitions(partition_dir):
+    """Return (month, path) for each monthly CSV in a partition directory, oldest first"""
+    partitions = []
+    for name in sorted(os.listdir(partition_dir)):
+        match = re.search(r'(\d{4})-(\d{2})\.csv$', name)
+        if match:
+            month = pd.Period(f"{match.group(1)}-{match.group(2)}", freq='M')
+            partitions.append((month, os.path.join(partition_dir, name)))
+    return sorted(partitions)
+
+def read_source(file_path, partition_dir):
+    """Read a dataset from its partition directory in parallel, or from the single CSV"""
+    if not os.path.isdir(partition_dir):
+        return pd.read_csv(file_path)
+    
+    paths = [path for _, path in list_partitions(partition_dir)]
+    if not paths:
+        raise FileNotFoundError(f"No monthly partitions found in {partition_dir}")
+    with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as executor:
+        frames = list(executor.map(pd.read_csv, paths))
+    return pd.concat(frames, ignore_index=True)
 
-def analyze_dataset(df, dataset_name):
-    """Analyze individual dataset quality"""
+def analyze_dataset(df, dataset_name, profile):
+    """Analyze individual dataset quality; missing values and duplicates come from its profile"""
     
     print(f"\n{dataset_name.upper()} DETAILED ANALYSIS")
     
@@ -59,27 +185,14 @@ def analyze_dataset(df, dataset_name):
     print(f"\nShape: {df.shape}")
     print(f"Memory usage: {df.memory_usage(deep=True).sum() / 1024**2:.2f} MB")
     
-    # Missing values analysis
-    print(f"\nMISSING VALUES:")
-    missing_counts = df.isnull().sum()
-    missing_percentages = (missing_counts / len(df)) * 100
-    
-    missing_summary = pd.DataFrame({
-        'Column': missing_counts.index,
-        'Missing_Count': missing_counts.values,
-        'Missing_Percentage': missing_percentages.values
-    }).sort_values('Missing_Percentage', ascending=False)
+    # Heaviest columns
+    memory_report = column_memory_report(df)
+    print(f"\nMEMORY BY COLUMN (top 5):")
+    for _, row in memory_report.head(5).iterrows():
+        print(f"   {row['Column']} ({row['Dtype']}): {row['Memory_MB']:.2f} MB ({row['Memory_Percentage']:.1f}%)")
     
-    # Show columns with missing values
-    columns_with_missing = missing_summary[missing_summary['Missing_Count'] > 0]
-    if len(columns_with_missing) > 0:
-        print("Columns with missing values:")
-        for _, row in columns_with_missing.head(10).iterrows():
-            print(f"   {row['Column']}: {row['Missing_Count']:,} ({row['Missing_Percentage']:.1f}%)")
-        if len(columns_with_missing) > 10:
-            print(f"   ... and {len(columns_with_missing) - 10} more columns")
-    else:
-        print("No missing values found!")
+    # Missing values analysis
+    report_missing_values(profile)
     
     # Data types analysis
     print(f"\nDATA TYPES:")
@@ -91,11 +204,7 @@ def analyze_dataset(df, dataset_name):
     print(f"\nPOTENTIAL DATA QUALITY ISSUES:")
     
     # Check for duplicate rows
-    duplicates = df.duplicated().sum()
-    if duplicates > 0:
-        print(f"   Duplicate rows: {duplicates:,}")
-    else:
-        print(f"   No duplicate rows")
+    report_duplicate_rows(profile)
     
     # Check for columns that should be numeric but aren't
     numeric_candidates = []
@@ -137,6 +246,55 @@ def analyze_dataset(df, dataset_name):
     print(f"\nSAMPLE DATA (first 3 rows):")
     print(df.head(3).to_string())
 
+def report_missing_values(profile):
+    """Print the columns with missing values in a merged profile"""
+    print(f"\nMISSING VALUES:")
+    missing_counts = pd.Series(profile['missing'], dtype='int64')
+    missing_percentages = (missing_counts / max(profile['rows'], 1)) * 100
+    
+    missing_summary = pd.DataFrame({
+        'Column': missing_counts.index,
+        'Missing_Count': missing_counts.values,
+        'Missing_Percentage': missing_percentages.values
+    }).sort_values('Missing_Percentage', ascending=False)
+    
+    # Show columns with missing values
+    columns_with_missing = missing_summary[missing_summary['Missing_Count'] > 0]
+    if len(columns_with_missing) > 0:
+        print("Columns with missing values:")
+        for _, row in columns_with_missing.head(10).iterrows():
+            print(f"   {row['Column']}: {row['Missing_Count']:,} ({row['Missing_Percentage']:.1f}%)")
+        if len(columns_with_missing) > 10:
+            print(f"   ... and {len(columns_with_missing) - 10} more columns")
+    else:
+        print("No missing values found!")
+
+def report_duplicate_rows(profile):
+    """Print the duplicate row count of a merged profile"""
+    if profile['duplicate_rows'] > 0:
+        print(f"   Duplicate rows: {profile['duplicate_rows']:,}")
+    else:
+        print(f"   No duplicate rows")
+
+def report_profile(profile, dataset_name):
+    """Print the sections served from a merged profile, without touching the rows"""
+    print(f"\nRows: {profile['rows']:,} in {profile['partitions_profiled'] + profile['partitions_reused']} partitions")
+    report_missing_values(profile)
+    print(f"\nPOTENTIAL DATA QUALITY ISSUES:")
+    report_duplicate_rows(profile)
+    print_rule_summary(profile_rule_summary(profile), dataset_name)
+
+def column_memory_report(df):
+    """Per-column resident memory (deep), heaviest first"""
+    memory = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'Column': memory.index,
+        'Dtype': [str(df[col].dtype) for col in memory.index],
+        'Memory_MB': memory.values / 1024**2,
+        'Memory_Percentage': (memory.values / memory.sum()) * 100 if memory.sum() else 0.0,
+    })
+    return report.sort_values('Memory_MB', ascending=False).reset_index(drop=True)
+
 def analyze_relationships(invoices_df, credit_notes_df):
     """Analyze relationships between datasets"""
     
@@ -171,12 +329,414 @@ def analyze_relationships(invoices_df, credit_notes_df):
         if credit_only_users:
             print(f"   Users in credit notes but not in invoices: {len(credit_only_users)}")
 
-def provide_quality_summary(invoices_df, credit_notes_df):
-    """Provide overall data quality assessment"""
+def rule_columns(expression, columns):
+    """Return the dataset columns referenced by a rule expression"""
+    names = re.findall(r'[A-Za-z_][A-Za-z0-9_]*', expression)
+    return [name for name in dict.fromkeys(names) if name in columns]
+
+def evaluate_rules(df, rules, tolerance=RULE_TOLERANCE):
+    """Evaluate declarative rules vectorized over the whole frame.
+
+    Returns a summary with one row per rule and a dict mapping each rule
+    name to the index labels of its offending rows. Rows where an operand is
+    missing are not checked rather than counted as violations.
+    """
+    # Convert every referenced column to numeric once, shared by all rules
+    referenced = []
+    for rule in rules:
+        referenced += rule_columns(rule['lhs'] + ' ' + rule['rhs'], df.columns)
+    arrays = {
+        col: pd.to_numeric(df[col], errors='coerce').to_numpy(dtype='float64')
+        for col in dict.fromkeys(referenced)
+    }
+    
+    summary = []
+    offending_rows = {}
+    for rule in rules:
+        expression = f"({rule['lhs']}) - ({rule['rhs']})"
+        missing = [
+            name for name in re.findall(r'[A-Za-z_][A-Za-z0-9_]*', expression)
+            if name not in df.columns
+        ]
+        if missing:
+            summary.append({
+                'rule': rule['name'], 'checked': 0, 'violations': 0,
+                'violation_pct': 0.0, 'max_abs_diff': np.nan,
+                'status': f"skipped (missing {', '.join(missing)})",
+            })
+            continue
+        
+        # Plain arrays keep pandas.eval (numexpr when installed) off the index
+        diff = pd.eval(expression, local_dict=arrays)
+        diff = np.broadcast_to(np.asarray(diff, dtype='float64'), (len(df),))
+        
+        op = rule.get('op', '==')
+        rule_tolerance = rule.get('tolerance', tolerance)
+        if op == '==':
+            violated = np.abs(diff) > rule_tolerance
+        elif op == '<=':
+            violated = diff > rule_tolerance
+        elif op == '>=':
+            violated = diff < -rule_tolerance
+        else:
+            raise ValueError(f"Unsupported rule operator: {op}")
+        
+        checked = int(np.count_nonzero(~np.isnan(diff)))
+        violating_positions = np.flatnonzero(violated)
+        violation_count = len(violating_positions)
+        offending_rows[rule['name']] = df.index[violating_positions]
+        summary.append({
+            'rule': rule['name'],
+            'checked': checked,
+            'violations': violation_count,
+            'violation_pct': (violation_count / checked * 100) if checked else 0.0,
+            'max_abs_diff': np.abs(diff[violating_positions]).max() if violation_count else 0.0,
+            'status': 'ok' if violation_count == 0 else 'failed',
+        })
+    
+    return pd.DataFrame(summary), offending_rows
+
+def report_rule_violations(df, rules, dataset_name, sample_size=5):
+    """Print rule results for a dataset with a sample of offending rows"""
+    
+    summary, offending_rows = evaluate_rules(df, rules)
+    print_rule_summary(summary, dataset_name)
+    
+    for rule in rules:
+        rows = offending_rows.get(rule['name'])
+        if rows is None or len(rows) == 0:
+            continue
+        columns = [col for col in ['id'] if col in df.columns]
+        columns += rule_columns(rule['lhs'] + ' ' + rule['rhs'], df.columns)
+        print(f"\n   Sample offending rows for '{rule['name']}':")
+        print(df.loc[rows[:sample_size], list(dict.fromkeys(columns))].to_string())
+    
+    return summary
+
+def print_rule_summary(summary, dataset_name):
+    """Print one line per rule of an evaluate_rules() style summary"""
+    print(f"\n{dataset_name.upper()} VALIDATION RULES:")
+    for _, row in summary.iterrows():
+        if row['status'].startswith('skipped'):
+            print(f"   {row['rule']}: {row['status']}")
+        elif row['violations'] == 0:
+            print(f"   {row['rule']}: OK ({row['checked']:,} rows checked)")
+        else:
+            print(f"   {row['rule']}: {row['violations']:,} violations "
+                  f"({row['violation_pct']:.1f}% of {row['checked']:,}), max difference {row['max_abs_diff']:,.2f}")
+
+def reconcile_credit_notes(invoices_df, credit_notes_df, tolerance=RULE_TOLERANCE):
+    """Join credit notes to their invoices on funding_invoice_id and flag disagreements.
+
+    The join is a single hash merge, and every check is a vectorized
+    comparison on the joined frame. Returns the credit notes with at least
+    one issue and the invoices whose applied credit exceeds their total.
+    Amounts keep the units of the inputs, so tolerance must use them too.
+    """
+    invoices = pd.DataFrame({
+        'invoice_key': pd.to_numeric(invoices_df['id'], errors='coerce'),
+        'invoice_number': invoices_df['invoice_number'].astype('object'),
+        'invoice_user_id': pd.to_numeric(invoices_df['user_id'], errors='coerce'),
+        'invoice_total': pd.to_numeric(invoices_df['total'], errors='coerce'),
+    }).dropna(subset=['invoice_key']).drop_duplicates('invoice_key')
+    
+    credits = pd.DataFrame({
+        'credit_note_id': credit_notes_df['id'],
+        'CreditNoteNumber': credit_notes_df['CreditNoteNumber'].astype('object'),
+        'invoice_key': pd.to_numeric(credit_notes_df['funding_invoice_id'], errors='coerce'),
+        'InvoiceNumber': credit_notes_df['InvoiceNumber'].astype('object'),
+        'user_id': pd.to_numeric(credit_notes_df['user_id'], errors='coerce'),
+        'Total': pd.to_numeric(credit_notes_df['Total'], errors='coerce'),
+        'AppliedAmount': pd.to_numeric(credit_notes_df['AppliedAmount'], errors='coerce'),
+    })
+    
+    joined = credits.merge(invoices, on='invoice_key', how='left')
+    has_invoice = joined['invoice_total'].notna() | joined['invoice_number'].notna()
+    
+    flags = {
+        'missing funding_invoice_id': joined['invoice_key'].isna(),
+        'invoice not found': joined['invoice_key'].notna() & ~has_invoice,
+        'InvoiceNumber mismatch': (
+            has_invoice & joined['InvoiceNumber'].notna() & joined['invoice_number'].notna()
+            & (joined['InvoiceNumber'].astype(str).str.strip() != joined['invoice_number'].astype(str).str.strip())
+        ),
+        'user_id mismatch': (
+            has_invoice & joined['user_id'].notna() & joined['invoice_user_id'].notna()
+            & (joined['user_id'] != joined['invoice_user_id'])
+        ),
+        'Total exceeds invoice total': has_invoice & (joined['Total'] > joined['invoice_total'] + tolerance),
+    }
+    
+    issues = pd.Series('', index=joined.index)
+    for name, flag in flags.items():
+        joined[name] = flag
+        issues = issues.where(~flag, issues + np.where(issues == '', '', '; ') + name)
+    joined['issues'] = issues
+    credit_note_issues = joined[issues != ''].reset_index(drop=True)
+    
+    # Credits per invoice, compared with the invoice total
+    per_invoice = credits.dropna(subset=['invoice_key']).groupby('invoice_key').agg(
+        credit_notes=('credit_note_id', 'count'),
+        credited=('Total', 'sum'),
+        applied=('AppliedAmount', 'sum'),
+    ).reset_index()
+    per_invoice = per_invoice.merge(invoices, on='invoice_key', how='inner')
+    per_invoice['excess'] = per_invoice['applied'] - per_invoice['invoice_total']
+    over_credited = per_invoice[per_invoice['excess'] > tolerance]
+    over_credited = over_credited.sort_values('excess', ascending=False).reset_index(drop=True)
+    
+    return credit_note_issues, over_credited
+
+def report_reconciliation(invoices_df, credit_notes_df, sample_size=5, output_dir=RECONCILIATION_OUTPUT_DIR):
+    """Print the credit note reconciliation and write its exceptions to CSV"""
+    
+    required_invoice = {'id', 'invoice_number', 'user_id', 'total'}
+    required_credit = {'id', 'CreditNoteNumber', 'funding_invoice_id', 'InvoiceNumber', 'user_id', 'Total', 'AppliedAmount'}
+    missing = (required_invoice - set(invoices_df.columns)) | (required_credit - set(credit_notes_df.columns))
+    if missing:
+        print(f"\n   Reconciliation skipped (missing columns: {', '.join(sorted(missing))})")
+        return None, None
+    
+    credit_note_issues, over_credited = reconcile_credit_notes(invoices_df, credit_notes_df)
+    
+    print(f"\nCREDIT NOTES CHECKED: {len(credit_notes_df):,}")
+    flag_columns = [
+        'missing funding_invoice_id', 'invoice not found', 'InvoiceNumber mismatch',
+        'user_id mismatch', 'Total exceeds invoice total',
+    ]
+    for flag in flag_columns:
+        count = int(credit_note_issues[flag].sum()) if len(credit_note_issues) else 0
+        print(f"   {flag}: {count:,}")
+    
+    print(f"\nOVER-CREDITED INVOICES: {len(over_credited):,}")
+    if len(over_credited):
+        print(f"   Total applied credit above invoice totals: ${over_credited['excess'].sum():,.2f}")
+        print(over_credited.head(sample_size)[
+            ['invoice_number', 'invoice_total', 'credit_notes', 'applied', 'excess']
+        ].to_string())
+    
+    if len(credit_note_issues):
+        print(f"\n   Sample credit notes with issues:")
+        print(credit_note_issues.head(sample_size)[
+            ['CreditNoteNumber', 'InvoiceNumber', 'invoice_number', 'user_id', 'invoice_user_id', 'issues']
+        ].to_string())
+    
+    os.makedirs(output_dir, exist_ok=True)
+    credit_note_issues.to_csv(os.path.join(output_dir, 'credit_note_issues.csv'), index=False)
+    over_credited.to_csv(os.path.join(output_dir, 'over_credited_invoices.csv'), index=False)
+    print(f"\n   Exceptions written to {output_dir}/")
+    
+    return credit_note_issues, over_credited
+
+def normalize_name(name):
+    """Lowercase letter tokens of a name, sorted so word order does not matter"""
+    if pd.isna(name):
+        return ''
+    return ' '.join(sorted(re.findall(r'[a-z]+', str(name).lower())))
+
+def name_similarity(a, b, threshold=0.0, matcher=None):
+    """Similarity ratio (0-1) between two normalized names.
+
+    Returns 0 early when a cheap upper bound already falls below threshold.
+    A matcher whose second sequence is already b can be passed to reuse its
+    index across many comparisons against b.
+    """
+    if a == b:
+        return 1.0
+    if 2 * min(len(a), len(b)) / (len(a) + len(b)) < threshold:
+        return 0.0
+    if matcher is None:
+        matcher = SequenceMatcher(None, a, b)
+    else:
+        matcher.set_seq1(a)
+    if matcher.quick_ratio() < threshold:
+        return 0.0
+    return matcher.ratio()
+
+def build_identities(invoices_df, credit_notes_df):
+    """Distinct (user_id, name) identities from invoices and credit notes"""
+    frames = []
+    for df, name_col, source in [
+        (invoices_df, 'display_name', 'invoices'),
+        (credit_notes_df, 'student_name', 'credit notes'),
+    ]:
+        if 'user_id' in df.columns and name_col in df.columns:
+            frames.append(pd.DataFrame({
+                'user_id': pd.to_numeric(df['user_id'], errors='coerce'),
+                'name': df[name_col].astype('object'),
+                'source': source,
+            }).dropna(subset=['user_id', 'name']).drop_duplicates())
+    if not frames:
+        return pd.DataFrame(columns=['user_id', 'name', 'sources', 'normalized'])
+    
+    identities = pd.concat(frames, ignore_index=True)
+    identities = identities.groupby(['user_id', 'name'], as_index=False).agg(
+        sources=('source', lambda values: ', '.join(sorted(set(values))))
+    )
+    identities['user_id'] = identities['user_id'].astype('int64')
+    identities['normalized'] = identities['name'].map(normalize_name)
+    identities = identities[identities['normalized'] != '']
+    return identities.drop_duplicates(['user_id', 'normalized']).reset_index(drop=True)
+
+def block_text(name, kind, token):
+    """The part of a normalized name a blocking key of this kind is cut from"""
+    if token is None:
+        return name
+    # Token keys refine on the rest of the name, with that token removed once
+    tokens = name.split()
+    tokens.remove(token)
+    return ' '.join(tokens)
+
+def block_key(name, kind, length, token=None):
+    """Blocking key of a normalized name: its start, its end, both ends, or a token plus part of the rest"""
+    text = block_text(name, kind, token)
+    if kind == 'prefix':
+        return '^' + text[:length]
+    if kind == 'suffix':
+        return text[-length:] + '$' if length else '$'
+    if kind == 'ends':
+        half = length // 2
+        return '^' + text[:half] + '|' + text[-half:] + '$'
+    if kind == 'token-prefix':
+        return token + '|^' + text[:length]
+    return token + '|' + (text[-length:] if length else '') + '$'
+
+def find_identity_conflicts(identities, threshold=NAME_SIMILARITY_THRESHOLD, max_block_size=MAX_BLOCK_SIZE):
+    """Find likely same-student pairs with different user_ids, and user_ids shared by different names.
+
+    Instead of comparing every pair of identities, candidates are only
+    compared within blocks sharing the start, the end, or both ends of the
+    normalized name, or one whole token. A single edit changes only one token,
+    so a multi-token name keeps the block of every other token, and the work
+    stays close to linear in the number of identities. Blocks larger than
+    max_block_size are split again on a key twice as long; token blocks split
+    on both the start and the end of the rest of the name, so an edit there
+    still leaves one of them intact. Blocks no longer key can split (e.g. many
+    identical common names) are skipped.
+
+    Returns the conflicts and a dict with how many blocks and distinct
+    identities were skipped.
+    """
+    user_ids = identities['user_id'].to_numpy()
+    names = identities['name'].to_numpy()
+    normalized = identities['normalized'].to_numpy()
+    
+    # Blocking index: name prefix / suffix / both ends / token -> identity
+    # positions, refining oversized blocks with longer keys of the same kind
+    blocks = []
+    skipped_blocks = []
+    pending = [
+        (kind, NAME_BLOCK_KEY_LENGTH, None, range(len(normalized)))
+        for kind in ['prefix', 'suffix', 'ends']
+    ]
+    tokens = {}
+    for position, name in enumerate(normalized):
+        for token in set(name.split()):
+            tokens.setdefault(token, []).append(position)
+    pending += [('token-prefix', 0, token, members) for token, members in tokens.items()]
+    
+    while pending:
+        kind, length, token, positions = pending.pop()
+        grouped = {}
+        for position in positions:
+            grouped.setdefault(block_key(normalized[position], kind, length, token), []).append(position)
+        for members in grouped.values():
+            if len(members) <= 1:
+                continue
+            if len(members) <= max_block_size:
+                blocks.append(members)
+            elif any(len(block_text(normalized[position], kind, token)) > length for position in members):
+                next_length = max(length * 2, 1)
+                pending.append((kind, next_length, token, members))
+                if kind == 'token-prefix':
+                    pending.append(('token-suffix', next_length, token, members))
+            else:
+                skipped_blocks.append(members)
+    
+    # Candidate partners of each identity; a pair sharing several keys is compared once
+    candidates = {}
+    for members in blocks:
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                if user_ids[a] != user_ids[b]:
+                    candidates.setdefault(b, set()).add(a)
+    
+    conflicts = []
+    for b, partners in candidates.items():
+        matcher = SequenceMatcher(None, '', normalized[b])
+        for a in partners:
+            similarity = name_similarity(normalized[a], normalized[b], threshold, matcher)
+            if similarity >= threshold:
+                conflicts.append({
+                    'issue': 'same student, different user_id',
+                    'user_id_a': user_ids[a], 'name_a': names[a],
+                    'user_id_b': user_ids[b], 'name_b': names[b],
+                    'similarity': similarity,
+                })
+    
+    # Names recorded under the same user_id are compared directly
+    shared = identities[identities.duplicated('user_id', keep=False)]
+    for user_id, group in shared.groupby('user_id'):
+        group_names = group['name'].tolist()
+        group_normalized = group['normalized'].tolist()
+        for i in range(len(group_normalized)):
+            for j in range(i + 1, len(group_normalized)):
+                similarity = name_similarity(group_normalized[i], group_normalized[j])
+                if similarity < threshold:
+                    conflicts.append({
+                        'issue': 'different students, same user_id',
+                        'user_id_a': user_id, 'name_a': group_names[i],
+                        'user_id_b': user_id, 'name_b': group_names[j],
+                        'similarity': similarity,
+                    })
+    
+    columns = ['issue', 'user_id_a', 'name_a', 'user_id_b', 'name_b', 'similarity']
+    conflicts_df = pd.DataFrame(conflicts, columns=columns)
+    conflicts_df = conflicts_df.sort_values(['issue', 'similarity'], ascending=[True, False]).reset_index(drop=True)
+    skipped = {
+        'blocks': len(skipped_blocks),
+        'identities': len({position for members in skipped_blocks for position in members}),
+    }
+    return conflicts_df, skipped
+
+def report_identity_conflicts(invoices_df, credit_notes_df, sample_size=10):
+    """Print likely misattributed students"""
     
-    # Calculate quality scores
-    invoice_quality_score = calculate_quality_score(invoices_df)
-    credit_quality_score = calculate_quality_score(credit_notes_df)
+    identities = build_identities(invoices_df, credit_notes_df)
+    print(f"\nSTUDENT IDENTITIES: {len(identities):,} distinct (user_id, name) pairs")
+    if identities.empty:
+        print("   No user_id/name columns to match")
+        return pd.DataFrame()
+    
+    conflicts, skipped = find_identity_conflicts(identities)
+    if skipped['blocks']:
+        print(f"   Skipped {skipped['blocks']:,} oversized name blocks covering {skipped['identities']:,} identities "
+              f"(more than {MAX_BLOCK_SIZE} names no longer key can split); pairs only found there are missed")
+    if conflicts.empty:
+        print("   No conflicting student identities found")
+        return conflicts
+    
+    for issue, group in conflicts.groupby('issue'):
+        print(f"\n   {issue.capitalize()}: {len(group):,} pairs")
+        for _, row in group.head(sample_size).iterrows():
+            print(f"      {row['user_id_a']} '{row['name_a']}' <-> {row['user_id_b']} '{row['name_b']}' "
+                  f"(similarity {row['similarity']:.2f})")
+        if len(group) > sample_size:
+            print(f"      ... and {len(group) - sample_size:,} more")
+    
+    return conflicts
+
+def provide_quality_summary(invoice_profile, credit_profile):
+    """Provide overall data quality assessment from the merged partition profiles"""
+    
+    # Calculate quality scores from the incremental per-partition profiles
+    invoice_quality_score = profile_quality_score(invoice_profile)
+    credit_quality_score = profile_quality_score(credit_profile)
+    
+    print(f"\nINCREMENTAL PROFILING:")
+    for name, profile in [("Funding Invoices", invoice_profile), ("Credit Notes", credit_profile)]:
+        print(f"   {name}: {profile['partitions_profiled']} partitions profiled, "
+              f"{profile['partitions_reused']} reused from {PROFILE_STORE_DIR}/")
     
     print(f"\nDATA QUALITY SCORES:")
     print(f"   Funding Invoices: {invoice_quality_score:.1f}/10")
@@ -190,8 +750,8 @@ def provide_quality_summary(invoices_df, credit_notes_df):
         print("   DATA CLEANING NEEDED:")
         
         # Check for missing values
-        invoice_missing = (invoices_df.isnull().sum().sum() / (len(invoices_df) * len(invoices_df.columns))) * 100
-        credit_missing = (credit_notes_df.isnull().sum().sum() / (len(credit_notes_df) * len(credit_notes_df.columns))) * 100
+        invoice_missing = profile_missing_percentage(invoice_profile)
+        credit_missing = profile_missing_percentage(credit_profile)
         
         if invoice_missing > 5:
             print(f"   - Handle missing values in invoices ({invoice_missing:.1f}% missing)")
@@ -218,25 +778,260 @@ def provide_quality_summary(invoices_df, credit_notes_df):
         quality_level = "POOR"
     
     print(f"\nOVERALL DATA QUALITY: {quality_level}")
+    
+    # Persist this run's scores and show the trend
+    record_quality_history([
+        ('invoices', invoice_profile, invoice_quality_score),
+        ('credit_notes', credit_profile, credit_quality_score),
+    ])
+    report_quality_trend()
 
-def calculate_quality_score(df):
-    """Calculate a quality score from 0-10 for a dataset"""
+def quality_score_from_counts(rows, columns, missing_cells, duplicate_rows, object_columns):
+    """Calculate a quality score from 0-10 from additive dataset counts"""
     score = 10.0
     
     # Penalize for missing values
-    missing_percentage = (df.isnull().sum().sum() / (len(df) * len(df.columns))) * 100
+    missing_percentage = (missing_cells / (rows * columns)) * 100
     score -= min(missing_percentage / 10, 3)  # Max 3 points deduction
     
     # Penalize for duplicates
-    duplicate_percentage = (df.duplicated().sum() / len(df)) * 100
+    duplicate_percentage = (duplicate_rows / rows) * 100
     score -= min(duplicate_percentage / 5, 2)  # Max 2 points deduction
     
     # Penalize for inconsistent data types
-    object_columns = len(df.select_dtypes(include=['object']).columns)
-    if object_columns / len(df.columns) > 0.7:  # Too many object columns
+    if object_columns / columns > 0.7:  # Too many object columns
         score -= 1
     
     return max(score, 0)
 
+def file_signature(path):
+    """Return an (mtime, size) signature that changes whenever the file is replaced"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def partition_keys(df, column=PROFILE_PARTITION_COLUMN):
+    """Label each row with its partition month as year * 100 + month, or 0 without a date"""
+    if column not in df.columns:
+        return np.zeros(len(df), dtype='int64')
+    created = pd.to_datetime(df[column], errors='coerce')
+    return (created.dt.year * 100 + created.dt.month).fillna(0).astype('int64').to_numpy()
+
+def profile_digest(rules):
+    """Hash of everything besides the data that a stored profile depends on"""
+    payload = json.dumps({'version': PROFILE_FORMAT_VERSION, 'rules': rules}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def partition_hash(schema, row_hashes):
+    """Content hash of a partition from its schema and its precomputed row hashes"""
+    digest = hashlib.sha256()
+    digest.update(schema.encode())
+    digest.update(row_hashes.tobytes())
+    return digest.hexdigest()
+
+def profile_partition(part, rules):
+    """Additive quality counts for one partition"""
+    summary, _ = evaluate_rules(part, rules)
+    return {
+        'rows': len(part),
+        'columns': list(part.columns),
+        'object_columns': list(part.select_dtypes(include=['object']).columns),
+        'missing': {col: int(count) for col, count in part.isnull().sum().items()},
+        'duplicate_rows': int(part.duplicated().sum()),
+        'rules': [
+            {
+                'rule': row['rule'],
+                'checked': int(row['checked']),
+                'violations': int(row['violations']),
+                'max_abs_diff': float(np.nan_to_num(row['max_abs_diff'])),
+                'status': row['status'],
+            }
+            for _, row in summary.iterrows()
+        ],
+    }
+
+def profile_files(partition_dir, stored, rules):
+    """Profile each monthly file, reading only files whose signature changed.
+
+    Identical rows share their invoice month, so duplicates never span files.
+    """
+    partitions = {}
+    profiled = reused = 0
+    for _, path in list_partitions(partition_dir):
+        key = os.path.basename(path)
+        signature = list(file_signature(path))
+        previous = stored.get(key)
+        if previous is not None and previous['signature'] == signature:
+            partitions[key] = previous
+            reused += 1
+        else:
+            partitions[key] = {'signature': signature, 'profile': profile_partition(pd.read_csv(path), rules)}
+            profiled += 1
+    return partitions, profiled, reused
+
+def profile_months(df, stored, rules):
+    """Profile a single-file dataset by created month, reprofiling months whose content hash changed.
+
+    Identical rows share a created timestamp, so duplicates never span months.
+    """
+    schema = repr([(col, str(dtype)) for col, dtype in df.dtypes.items()])
+    # Rows are hashed in one vectorized pass, then each month's slice is digested
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    
+    months = partition_keys(df)
+    partitions = {}
+    profiled = reused = 0
+    for month, positions in sorted(pd.Series(months).groupby(months).indices.items()):
+        key = str(month)
+        content_hash = partition_hash(schema, row_hashes[positions])
+        previous = stored.get(key)
+        if previous is not None and previous['hash'] == content_hash:
+            partitions[key] = previous
+            reused += 1
+        else:
+            partitions[key] = {'hash': content_hash, 'profile': profile_partition(df.iloc[positions], rules)}
+            profiled += 1
+    return partitions, profiled, reused
+
+def incremental_profile(file_path, partition_dir, dataset_key, rules, df=None, store_dir=PROFILE_STORE_DIR):
+    """Profile a dataset partition by partition, reusing stored profiles that are still current.
+
+    With a partition directory each monthly file is a partition keyed on its
+    file signature, and unchanged files are not read. A single CSV is split
+    by created month and compared by content hash, and is not read at all
+    when its signature matches the last run. Pass df to reuse an already
+    loaded single CSV. Returns the merged profile for the whole dataset along
+    with how many partitions were profiled versus reused.
+    """
+    store_path = os.path.join(store_dir, f"{dataset_key}_partitions.json")
+    store = {}
+    if os.path.exists(store_path):
+        with open(store_path) as f:
+            store = json.load(f)
+    
+    # Changing the rules or the profile format invalidates every stored partition
+    rules_digest = profile_digest(rules)
+    stored = store.get('partitions', {}) if store.get('digest') == rules_digest else {}
+    
+    if os.path.isdir(partition_dir):
+        source_signature = None
+        partitions, profiled, reused = profile_files(partition_dir, stored, rules)
+    else:
+        if file_signature(file_path) is None:
+            raise FileNotFoundError(f"No such file: '{file_path}'")
+        source_signature = list(file_signature(file_path))
+        if stored and store.get('source_signature') == source_signature:
+            partitions, profiled, reused = stored, 0, len(stored)
+        else:
+            if df is None:
+                df = pd.read_csv(file_path)
+            partitions, profiled, reused = profile_months(df, stored, rules)
+    
+    # Partitions that disappeared from the source are dropped from the store
+    os.makedirs(store_dir, exist_ok=True)
+    with open(store_path, 'w') as f:
+        json.dump({'digest': rules_digest, 'source_signature': source_signature, 'partitions': partitions}, f)
+    
+    return merge_profiles([entry['profile'] for entry in partitions.values()], profiled, reused)
+
+def merge_profiles(profiles, profiled, reused):
+    """Sum partition profiles into one dataset profile"""
+    columns = list(dict.fromkeys(col for profile in profiles for col in profile['columns']))
+    object_columns = {col for profile in profiles for col in profile['object_columns']}
+    merged = {
+        'rows': 0,
+        'columns': len(columns),
+        'object_columns': len(object_columns),
+        'missing': {col: 0 for col in columns},
+        'duplicate_rows': 0,
+        'rule_violations': {},
+        'rules': {},
+        'partitions_profiled': profiled,
+        'partitions_reused': reused,
+    }
+    for profile in profiles:
+        merged['rows'] += profile['rows']
+        merged['duplicate_rows'] += profile['duplicate_rows']
+        # A column absent from a partition is missing on all of its rows once combined
+        for col in columns:
+            merged['missing'][col] += profile['missing'].get(col, profile['rows'])
+        for rule in profile['rules']:
+            total = merged['rules'].setdefault(rule['rule'], {
+                'checked': 0, 'violations': 0, 'max_abs_diff': 0.0, 'status': rule['status'],
+            })
+            total['checked'] += rule['checked']
+            total['violations'] += rule['violations']
+            total['max_abs_diff'] = max(total['max_abs_diff'], rule['max_abs_diff'])
+            if not rule['status'].startswith('skipped'):
+                total['status'] = 'ok' if total['violations'] == 0 else 'failed'
+    merged['rule_violations'] = {rule: total['violations'] for rule, total in merged['rules'].items()}
+    
+    return merged
+
+def profile_missing_percentage(profile):
+    """Percentage of missing cells in a merged profile"""
+    cells = profile['rows'] * profile['columns']
+    return (sum(profile['missing'].values()) / cells) * 100 if cells else 0.0
+
+def profile_rule_summary(profile):
+    """Rule results of a merged profile, in the shape evaluate_rules() returns"""
+    summary = pd.DataFrame(
+        [{'rule': rule, **total} for rule, total in profile['rules'].items()],
+        columns=['rule', 'checked', 'violations', 'max_abs_diff', 'status'],
+    )
+    summary['violation_pct'] = np.where(
+        summary['checked'] > 0, summary['violations'] / summary['checked'].clip(lower=1) * 100, 0.0
+    )
+    return summary
+
+def profile_quality_score(profile):
+    """Quality score (0-10) of a merged profile"""
+    return quality_score_from_counts(
+        rows=profile['rows'],
+        columns=profile['columns'],
+        missing_cells=sum(profile['missing'].values()),
+        duplicate_rows=profile['duplicate_rows'],
+        object_columns=profile['object_columns'],
+    )
+
+def record_quality_history(entries, store_dir=PROFILE_STORE_DIR):
+    """Append one row per dataset for this run to the score history"""
+    run_at = datetime.now().isoformat(timespec='seconds')
+    history = pd.DataFrame([
+        {
+            'run_at': run_at,
+            'dataset': dataset_key,
+            'rows': profile['rows'],
+            'quality_score': round(score, 2),
+            'missing_pct': round(profile_missing_percentage(profile), 2),
+            'duplicate_rows': profile['duplicate_rows'],
+            'rule_violations': sum(profile['rule_violations'].values()),
+            'partitions_profiled': profile['partitions_profiled'],
+            'partitions_reused': profile['partitions_reused'],
+        }
+        for dataset_key, profile, score in entries
+    ])
+    history_path = os.path.join(store_dir, 'history.csv')
+    os.makedirs(store_dir, exist_ok=True)
+    history.to_csv(history_path, mode='a', header=not os.path.exists(history_path), index=False)
+
+def report_quality_trend(store_dir=PROFILE_STORE_DIR, last_runs=5):
+    """Print quality scores of the most recent runs"""
+    history_path = os.path.join(store_dir, 'history.csv')
+    if not os.path.exists(history_path):
+        return
+    
+    history = pd.read_csv(history_path)
+    trend = history.pivot_table(index='run_at', columns='dataset', values='quality_score', aggfunc='last')
+    print(f"\nQUALITY TREND (last {min(last_runs, len(trend))} runs):")
+    print(trend.tail(last_runs).to_string())
+
 if __name__ == "__main__":
-    analyze_data_quality()  
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Data quality report for the funding invoice datasets")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only refresh changed partitions and report from the stored profiles")
+    args = parser.parse_args()
+    
+    analyze_data_quality(incremental=args.incremental)  
\ No newline at end of file
@@ -0,0 +1,62 @@
+import random
+
+import pandas as pd
+
+from data_quality_analysis import (
+    NAME_SIMILARITY_THRESHOLD,
+    find_identity_conflicts,
+    name_similarity,
+    normalize_name,
+)
+
+FIRST_NAMES = ['John', 'Sarah', 'Mohammed', 'Priya', 'Chen', 'Olivia', 'Ahmad', 'Grace', 'Liam', 'Nguyen']
+LAST_NAMES = ['Smith', 'Jones', 'Patel', 'Khan', 'Williams', 'Tran', 'Brown', 'Singh', 'Taylor', 'Ali']
+
+def make_identities(rows):
+    identities = pd.DataFrame(rows, columns=['user_id', 'name'])
+    identities['normalized'] = identities['name'].map(normalize_name)
+    return identities
+
+def same_student_pairs(conflicts):
+    conflicts = conflicts[conflicts['issue'] == 'same student, different user_id']
+    return {frozenset(pair) for pair in zip(conflicts['user_id_a'], conflicts['user_id_b'])}
+
+def brute_force_pairs(identities):
+    user_ids = identities['user_id'].tolist()
+    normalized = identities['normalized'].tolist()
+    pairs = set()
+    for a in range(len(normalized)):
+        for b in range(a + 1, len(normalized)):
+            if user_ids[a] != user_ids[b] and name_similarity(normalized[a], normalized[b]) >= NAME_SIMILARITY_THRESHOLD:
+                pairs.add(frozenset((user_ids[a], user_ids[b])))
+    return pairs
+
+def misspell(name, rng):
+    """Delete, insert or replace one letter inside a word of the name"""
+    positions = [i for i in range(1, len(name) - 1) if name[i] != ' ' and name[i - 1] != ' ']
+    i = rng.choice(positions)
+    letter = rng.choice('abcdefghijklmnopqrstuvwxyz')
+    edit = rng.choice(['delete', 'insert', 'replace'])
+    if edit == 'delete':
+        return name[:i] + name[i + 1:]
+    if edit == 'insert':
+        return name[:i] + letter + name[i:]
+    return name[:i] + letter + name[i + 1:]
+
+def test_short_names_with_one_edit_are_matched():
+    identities = make_identities([(1, 'John Smith'), (2, 'Jon Smith'), (3, 'Sarah Jones'), (4, 'Sara Jones')])
+    conflicts, skipped = find_identity_conflicts(identities)
+    assert same_student_pairs(conflicts) == {frozenset((1, 2)), frozenset((3, 4))}
+    assert skipped == {'blocks': 0, 'identities': 0}
+
+def test_blocking_recall_matches_brute_force():
+    rng = random.Random(0)
+    names = [f'{first} {last}' for first in FIRST_NAMES for last in LAST_NAMES]
+    rows = [(user_id, name) for user_id, name in enumerate(names)]
+    rows += [(len(names) + user_id, misspell(name, rng)) for user_id, name in enumerate(names)]
+    identities = make_identities(rows)
+
+    # Small blocks force the oversized-block refinement to run
+    conflicts, skipped = find_identity_conflicts(identities, max_block_size=5)
+    assert skipped['blocks'] == 0
+    assert same_student_pairs(conflicts) == brute_force_pairs(identities)